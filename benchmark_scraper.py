@@ -0,0 +1,33 @@
+"""
+Compares the cleaning engines of ScheduleScraper on every sheet of timetable.xlsx.
+The workbook is read once, so only the cleaning is measured.
+
+Usage:
+python benchmark_scraper.py [timetable.xlsx] [repeat]
+"""
+import sys
+from timeit import timeit
+
+from pandas import ExcelFile
+
+from main.scraper import ScheduleScraper
+
+
+def main(file: str = 'timetable.xlsx', repeat: int = 20) -> None:
+    with ExcelFile(file) as xls:
+        dataframes = {name: xls.parse(name) for name in xls.sheet_names}
+
+    def clean(engine: str) -> None:
+        for name, dataframe in dataframes.items():
+            ScheduleScraper(file=file, sheet_name=name, dataframe=dataframe, engine=engine)
+
+    results = {engine: timeit(lambda: clean(engine), number=repeat) / repeat for engine in ('json', 'vectorized')}
+
+    for engine, seconds in results.items():
+        print(f'{engine:>10}: {seconds * 1000:8.2f} ms for {len(dataframes)} sheets')
+    print(f'   speedup: {results["json"] / results["vectorized"]:.2f}x')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else 'timetable.xlsx',
+         int(sys.argv[2]) if len(sys.argv) > 2 else 20)
@@ -1,9 +1,17 @@
 from django import forms
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR
 from .models import (Student, Faculty, StudentOfFaculty, Speciality, Teacher, Subject, Language, 
                      StudentStatus, News, Notification, Application, ApplicationStatus, 
                      StudentOfLanguage, StudentOfSpeciality, TypeOfGrades, Grade, 
-                     DayOfWeek, ScheduleVersion, Schedule, Category, Responsible, Executor, ApplicationInformation)
+                     DayOfWeek, ScheduleVersion, ScheduleSheet, Schedule, Category, Responsible, Executor, ApplicationInformation,
+                     PdfRenderJob, ApplicationCounter)
+from django.contrib import messages
+from django.urls import reverse
+from .application_status import change_status
+from .downloads import zip_response
+from .pdf import application_archive_entries
+from .search import search_applications
 from django.utils.html import format_html
 
 
@@ -79,6 +87,11 @@ admin.site.register(Notification)
 admin.site.register(DayOfWeek)
 admin.site.register(ScheduleVersion)
 
+@admin.register(ScheduleSheet)
+class ScheduleSheetAdmin(admin.ModelAdmin):
+    list_display = ('sheet_name', 'source', 'speciality', 'version', 'updated_at')
+    list_filter = ('source',)
+
 @admin.register(Schedule)
 class ScheduleAdmin(admin.ModelAdmin):
     list_display = ('day_of_week', 'time_start', 'time_end', 'subject', 'teacher', 'room')
@@ -86,8 +99,9 @@ class ScheduleAdmin(admin.ModelAdmin):
 @admin.register(Application)
 class ApplicationAdmin(admin.ModelAdmin):
     list_display = ('id', 'student', 'title', 'category', 'responsible', 'created_at', 'updated_at', 'executor', 'status', 'get_pdf_link')
-    list_filter = ('status',)
-    search_fields = ('id', 'title', 'status', 'get_pdf_link')
+    list_filter = ('status', 'pdf_status')
+    search_fields = ('title', 'description')
+    actions = ['export_pdf_archive']
 
     def get_readonly_fields(self, request, obj=None):
         if obj:  
@@ -99,12 +113,64 @@ class ApplicationAdmin(admin.ModelAdmin):
             obj.status = 'in_progress'
         super().save_model(request, obj, form, change)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Номер заявления ищется точно, остальное — по полнотекстовому индексу.
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if search_term.isdigit():
+            return queryset.filter(pk=int(search_term)), False
+        # Как и раньше, можно искать по статусу: "исполн", "done".
+        term = search_term.lower()
+        statuses = [value for value, label in Application.STATUS_CHOICES if term in value or term in label.lower()]
+        if statuses:
+            return queryset.filter(status__in=statuses), False
+        results = search_applications(queryset, search_term)
+        # Сортировка по столбцу, выбранная в списке, важнее релевантности.
+        if ORDER_VAR in request.GET:
+            results = results.order_by(*queryset.query.order_by)
+        return results, False
+
     def get_pdf_link(self, obj):
-        if obj.pdf_file:
-            return format_html('<a href="{}" target="_blank">Скачать PDF</a>', obj.pdf_file.url)
-        return "PDF не создан"
+        # PDF создаётся при первом скачивании, поэтому ссылка есть всегда.
+        link = format_html('<a href="{}" target="_blank">Скачать PDF</a>', reverse('application-pdf', args=[obj.pk]))
+        if obj.pdf_status == 'failed':
+            return format_html('{} (ошибка создания)', link)
+        return link
     get_pdf_link.short_description = 'PDF файл'
 
+    def get_actions(self, request):
+        # Одно действие на каждый статус: "Статус: Исполнено" и т.д.
+        actions = super().get_actions(request)
+        for value, label in Application.STATUS_CHOICES:
+            name = f'set_status_{value}'
+            actions[name] = (self.status_action(value), name, f'Статус: {label}')
+        return actions
+
+    @staticmethod
+    def status_action(status):
+        def set_status(modeladmin, request, queryset):
+            result = change_status(list(queryset.values_list('id', flat=True)), status)
+            modeladmin.message_user(request, f'Статус изменён у {len(result["updated"])} заявлений.')
+            for application_id, reason in result['rejected'].items():
+                modeladmin.message_user(request, f'Заявление {application_id}: {reason}', messages.WARNING)
+        return set_status
+
+    @admin.action(description='Скачать PDF выбранных заявлений (ZIP)')
+    def export_pdf_archive(self, request, queryset):
+        return zip_response(application_archive_entries(queryset.order_by('id')), 'applications.zip')
+
+@admin.register(ApplicationCounter)
+class ApplicationCounterAdmin(admin.ModelAdmin):
+    list_display = ('dimension', 'key', 'count')
+    list_filter = ('dimension',)
+
+@admin.register(PdfRenderJob)
+class PdfRenderJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'application', 'status', 'attempts', 'created_at', 'started_at', 'finished_at')
+    list_filter = ('status',)
+    raw_id_fields = ('application',)
+
 @admin.register(ApplicationStatus)
 class ApplicationStatusAdmin(admin.ModelAdmin):
     list_display = ('name', 'is_active')
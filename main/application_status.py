@@ -0,0 +1,67 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .constants import APPLICATION_STATUS_TRANSITIONS
+from .counters import add_to_counter
+from .models import Application, PdfRenderJob
+from .pdf import PDF_TEMPLATE
+
+
+@lru_cache(maxsize=None)
+def pdf_depends_on(field: str) -> bool:
+    """
+    Whether the PDF template uses this Application field ("application.status" or
+    "application.get_status_display", in a variable or a tag). "application.student.status" is
+    the student's field, so it doesn't count.
+    """
+    source = get_template(PDF_TEMPLATE).template.source
+    return re.search(rf'\bapplication\.(?:{field}|get_{field}_display)\b', source) is not None
+
+
+def change_status(ids: List[int], status: str) -> Dict[str, Any]:
+    """
+    Moves applications to "status" with one UPDATE, skipping those whose current status does not
+    allow it (APPLICATION_STATUS_TRANSITIONS). Status counters are adjusted in the same transaction,
+    and PDF renders are queued only if the PDF shows the status.
+
+    Returns {"updated": ids, "rejected": {id: reason}, "not_found": ids}.
+    """
+    if status not in dict(Application.STATUS_CHOICES):
+        raise ValueError(f'Unknown status "{status}".')
+
+    with transaction.atomic():
+        current = dict(
+            Application.objects.select_for_update().filter(id__in=ids).values_list('id', 'status'))
+
+        updated, rejected, moved = [], {}, {}
+        for application_id, old_status in current.items():
+            if old_status == status:
+                continue
+            if status not in APPLICATION_STATUS_TRANSITIONS.get(old_status, ()):
+                rejected[application_id] = f'Cannot change status from "{old_status}" to "{status}".'
+                continue
+            updated.append(application_id)
+            moved[old_status] = moved.get(old_status, 0) + 1
+
+        if updated:
+            # queryset.update() skips save() and its signals, so the counters are moved here.
+            Application.objects.filter(id__in=updated).update(status=status, updated_at=timezone.now())
+            for old_status, count in moved.items():
+                add_to_counter('status', old_status, -count)
+            add_to_counter('status', status, len(updated))
+
+            if getattr(settings, 'APPLICATION_PDF_EAGER', False) and pdf_depends_on('status'):
+                PdfRenderJob.objects.bulk_create([PdfRenderJob(application_id=application_id)
+                                                  for application_id in updated])
+
+    return {
+        'updated': sorted(updated),
+        'rejected': rejected,
+        'not_found': sorted(set(ids) - set(current)),
+    }
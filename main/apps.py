@@ -8,3 +8,5 @@ class MainConfig(AppConfig):
 
     def ready(self):
         import main.signals
+        from main.timetable_registry import start_watchers
+        start_watchers()
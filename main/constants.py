@@ -1,39 +1,20 @@
-SPECIALITY_SHEET_MAP = {
-    'New media ро': 'New media ро',
-    'Digital FM': 'Digital FM',
-    'СО 2кРО': 'СО 2кРО',
-    'УиСМ 2кро +НиШро': 'УиСМ 2кро +НиШро',
-    'ПС 2кРО': 'ПС 2кРО',
-    'ЮР 2кРО+ТиПО': 'ЮР 2кРО+ТиПО',
-    'МОиЭ2кРО': 'МОиЭ2кРО',
-    'ИС 2кРО+ТиПО': 'ИС 2кРО+ТиПО',
-    'DS,PM,SE+ТиПО 2кРО': 'DS,PM,SE+ТиПО 2кРО',
-    'РДиГБ 2кРО+ТиПО': 'РДиГБ 2кРО+ТиПО',
-    'ТУР 2кРО+ТиПО': 'ТУР 2кРО+ТиПО',
-    'БАОП+ТиПО 2кРО': 'БАОП+ТиПО 2кРО',
-    'ФН 2кРО+ТиПО': 'ФН 2кРО+ТиПО',
-    'УиА 2кРО+ТиПО': 'УиА 2кРО+ТиПО',
-    'БАиЭ 2кРО+ТиПО': 'БАиЭ 2кРО+ТиПО',
-    'CO2кКО': 'CO2кКО',
-    'МН 2кРО+ТиПО': 'МН 2кРО+ТиПО',
-    'МГ 2кРО+ТиПО': 'МГ 2кРО+ТиПО',
-    'ЛОГ 2к ро+ТиПО': 'ЛОГ 2к ро+ТиПО',
-    'РДиГБ2кКО': 'РДиГБ2кКО',
-    'ЮР 2кКО': 'ЮР 2кКО',
-    'ФН 2кКО': 'ФН 2кКО',
-    'ИС 2кко': 'ИС 2кко',
-    'МН 2кКО': 'МН 2кКО',
-    'МГ2кКО': 'МГ2кКО',
-    'ЛОГ 2кКО': 'ЛОГ 2кКО',
-    'РДиГБ 2кАО': 'РДиГБ 2кАО',
-    'SE,DS+НИШ 2кАО': 'SE,DS+НИШ 2кАО',
-    'ТУР 2кАО': 'ТУР 2кАО',
-    'МО 2к АО': 'МО 2к АО',
-    'ФН 2кАО': 'ФН 2кАО',
-    'МН 2кАО': 'МН 2кАО',
-    'МГ 2кАО': 'МГ 2кАО',
-    'ЛОГ 2кАО': 'ЛОГ 2кАО',
-    'GM 2кАО': 'GM 2кАО',
-    'IT 2кАО': 'IT 2кАО',
-    'БАиЭ 2кАО': 'БАиЭ 2кАО',
+# Отделение (язык обучения) определяется по суффиксу листа: "2кРО", "2кКО", "2кАО".
+LANGUAGE_DEPARTMENT_MAP = {
+    'ро': 'Русский',
+    'ко': 'Казахский',
+    'ао': 'Английский',
+}
+
+DEFAULT_LANGUAGE = 'Русский'
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Разрешённые переходы статуса заявления: текущий статус -> в какие можно перевести.
+# 'in_process' - значение по умолчанию у заявлений, созданных через API.
+APPLICATION_STATUS_TRANSITIONS = {
+    'in_process': {'in_progress', 'done', 'completed', 'incomplete'},
+    'in_progress': {'done', 'completed', 'incomplete'},
+    'incomplete': {'in_progress', 'done', 'completed'},
+    'done': {'completed', 'in_progress'},
+    'completed': {'in_progress'},
 }
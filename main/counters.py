@@ -0,0 +1,127 @@
+from typing import Any, Dict, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Application, ApplicationCounter, Category, Executor, Responsible
+
+
+# Counter dimension -> Application attribute it counts.
+DIMENSIONS = {
+    'status': 'status',
+    'category': 'category_id',
+    'executor': 'executor_id',
+    'responsible': 'responsible_id',
+}
+
+# Dimensions whose keys are ids of these models: the stats show their names.
+DIMENSION_MODELS = {
+    'category': Category,
+    'executor': Executor,
+    'responsible': Responsible,
+}
+
+
+def counter_key(value: Any) -> str:
+    return '' if value is None else str(value)
+
+
+def counter_keys(application: Application) -> Optional[Dict[str, str]]:
+    """
+    Counter keys of an application, or None if some of them were not loaded (.only()/.defer()).
+    Reads the instance __dict__ only, so it never queries the database.
+    """
+    values = application.__dict__
+    if any(attname not in values for attname in DIMENSIONS.values()):
+        return None
+    return {dimension: counter_key(values[attname]) for dimension, attname in DIMENSIONS.items()}
+
+
+def add_to_counter(dimension: str, key: str, delta: int) -> None:
+    if not delta:
+        return
+    counters = ApplicationCounter.objects.filter(dimension=dimension, key=key)
+    if counters.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            ApplicationCounter.objects.create(dimension=dimension, key=key, count=delta)
+    except IntegrityError:
+        # Another transaction created the row meanwhile.
+        counters.update(count=F('count') + delta)
+
+
+def move_counters(old: Optional[Dict[str, str]], new: Optional[Dict[str, str]]) -> None:
+    """
+    Applies the change of an application from the "old" keys (None: it didn't exist) to the
+    "new" ones (None: it was deleted). Only the counters that change are touched.
+    """
+    for dimension in DIMENSIONS:
+        old_key = old[dimension] if old is not None else None
+        new_key = new[dimension] if new is not None else None
+        if old_key == new_key:
+            continue
+        if old_key is not None:
+            add_to_counter(dimension, old_key, -1)
+        if new_key is not None:
+            add_to_counter(dimension, new_key, 1)
+
+
+def reconcile_counters() -> Dict[str, int]:
+    """
+    Recounts every counter from the Application table and fixes the stored ones. Catches changes
+    made without signals (queryset.update(), raw SQL). Returns {"dimension=key": stored - actual}
+    for the counters that were wrong.
+    """
+    with transaction.atomic():
+        # The counters are locked before counting: a save made meanwhile waits for the lock and
+        # then adds to the fixed value, instead of being overwritten with a total that predates it.
+        stored = {
+            (counter.dimension, counter.key): counter
+            for counter in ApplicationCounter.objects.select_for_update()
+        }
+
+        actual = {}
+        for dimension, attname in DIMENSIONS.items():
+            for row in Application.objects.order_by().values(attname).annotate(total=Count('id')):
+                actual[(dimension, counter_key(row[attname]))] = row['total']
+
+        differences = {}
+        for key in stored.keys() | actual.keys():
+            counter, count = stored.get(key), actual.get(key, 0)
+            if counter is not None and counter.count == count:
+                continue
+            differences[f'{key[0]}={key[1]}'] = (counter.count if counter else 0) - count
+            if counter is None:
+                ApplicationCounter.objects.create(dimension=key[0], key=key[1], count=count)
+            elif count:
+                ApplicationCounter.objects.filter(pk=counter.pk).update(count=count)
+            else:
+                counter.delete()
+        return differences
+
+
+def application_stats() -> Dict[str, Any]:
+    """
+    Counts per status, category, executor and responsible, read from the counter table:
+    the cost depends on the number of distinct values, not on the number of applications.
+    """
+    stats: Dict[str, Dict[str, Any]] = {dimension: {} for dimension in DIMENSIONS}
+    counters = ApplicationCounter.objects.filter(count__gt=0).order_by('dimension', 'key')
+    for counter in counters:
+        stats[counter.dimension][counter.key] = counter.count
+
+    status_labels = dict(Application.STATUS_CHOICES)
+    result: Dict[str, Any] = {
+        'status': [{'key': key, 'name': status_labels.get(key, key), 'count': count}
+                   for key, count in stats['status'].items()],
+    }
+    for dimension, model in DIMENSION_MODELS.items():
+        names = model.objects.in_bulk([int(key) for key in stats[dimension] if key])
+        result[dimension] = [
+            {'key': int(key) if key else None, 'name': str(names[int(key)]) if key and int(key) in names else None,
+             'count': count}
+            for key, count in stats[dimension].items()
+        ]
+    result['total'] = sum(stats['status'].values())
+    return result
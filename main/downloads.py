@@ -0,0 +1,173 @@
+import os
+from re import compile
+from time import localtime
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile, ZipInfo
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+RANGE_PATTERN = compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single "bytes=start-end" range into inclusive (start, end) offsets.
+    Returns None for headers we don't handle (several ranges, other units): the whole file is sent.
+    Raises ValueError if the range lies outside the file.
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        # "bytes=-500": the last 500 bytes.
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(f'Range "{header}" is outside of the {size} bytes file.')
+    return start, end
+
+
+def read_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    with open(path, 'rb') as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def file_response(request, path: str, etag: str, filename: str,
+                  content_type: str = 'application/octet-stream') -> HttpResponse:
+    """
+    Streams a file with ETag/Last-Modified validators. Answers conditional GETs with 304 and
+    "Range: bytes=..." requests with 206, honouring If-Range.
+
+    Example usage:
+    file_response(request, "/media/a.pdf", pdf_hash, "a.pdf", "application/pdf")
+    """
+    size = os.path.getsize(path)
+    last_modified = int(os.path.getmtime(path))
+    etag = f'"{etag}"'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        byte_range = None
+        range_header = request.META.get('HTTP_RANGE')
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if range_header and request.method == 'GET' and (not if_range or if_range == etag):
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+
+        if byte_range is None:
+            response = FileResponse(open(path, 'rb'), content_type=content_type, filename=filename)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(read_range(path, start, end), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Disposition'] = f'inline; filename="{filename}"'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    # The files are per user: browsers may keep them, but must revalidate and shared caches must not store them.
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def not_modified_response(request, etag: str) -> Optional[HttpResponse]:
+    """
+    Answers "If-None-Match" from the stored ETag alone, before the file is produced or even opened.
+    Returns None unless the client's copy is current.
+    """
+    etag = f'"{etag}"'
+    if request.method not in ('GET', 'HEAD') or not request.META.get('HTTP_IF_NONE_MATCH'):
+        return None
+    response = get_conditional_response(request, etag=etag)
+    if response is None or response.status_code != 304:
+        return None
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+class ZipStreamBuffer:
+    """
+    Write-only file object that ZipFile writes to. It can't seek, so ZipFile writes the sizes
+    after each member's data, and whatever was written so far can be taken out with "pop".
+    """
+
+    def __init__(self) -> None:
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def pop(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+ZipSource = Union[str, bytes, Iterable[bytes]]
+
+
+def stream_zip(entries: Iterable[Tuple[str, ZipSource]]) -> Iterator[bytes]:
+    """
+    Builds a ZIP archive on the fly and yields it in chunks, without temporary files.
+    An entry is (name in the archive, path of a file, the content itself or an iterable of
+    content chunks). Files are stored as they are (PDFs are compressed already), content is deflated.
+
+    Example usage:
+    StreamingHttpResponse(stream_zip([("a.pdf", "/media/a.pdf"), ("list.csv", b"id")]))
+    """
+    buffer = ZipStreamBuffer()
+    with ZipFile(buffer, 'w') as archive:
+        for name, source in entries:
+            is_file = isinstance(source, str)
+            modified = localtime(os.path.getmtime(source)) if is_file else localtime()
+            info = ZipInfo(name, date_time=modified[:6])
+            info.compress_type = ZIP_STORED if is_file else ZIP_DEFLATED
+            with archive.open(info, 'w') as member:
+                if isinstance(source, bytes):
+                    member.write(source)
+                elif is_file:
+                    with open(source, 'rb') as file:
+                        for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+                            member.write(chunk)
+                            yield buffer.pop()
+                else:
+                    for chunk in source:
+                        member.write(chunk)
+                        yield buffer.pop()
+            yield buffer.pop()
+    yield buffer.pop()
+
+
+def zip_response(entries: Iterable[Tuple[str, ZipSource]], filename: str) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(stream_zip(entries), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
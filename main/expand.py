@@ -0,0 +1,74 @@
+from typing import Dict, List
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+from .filters import split_values
+
+
+def requested_expansions(request, expandable_fields: Dict) -> List[str]:
+    """
+    Relation names from "?expand=speciality,status" (or repeated ?expand=). Only reads expand:
+    a serializer can't take nested objects as input. Raises ValidationError for unknown names.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return []
+    names = split_values(request.query_params.getlist('expand'))
+    unknown = [name for name in names if name not in expandable_fields]
+    if unknown:
+        raise ValidationError({'expand': f'Unknown relations: {", ".join(unknown)}. '
+                                         f'Allowed: {", ".join(expandable_fields)}.'})
+    return list(dict.fromkeys(names))
+
+
+class ExpandableSerializerMixin:
+    """
+    Replaces the ids of the relations listed in ?expand= with nested objects.
+    Meta.expandable_fields maps the relation to the serializer of the related model.
+    Only the serializer the view creates expands: nested ones get no request in their context.
+
+    Example usage:
+    class GradeSerializer(ExpandableSerializerMixin, SparseModelSerializer):
+        class Meta:
+            model = Grade
+            fields = '__all__'
+            expandable_fields = {'subject': SubjectSerializer}
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        expandable_fields = self.Meta.expandable_fields
+        for name in requested_expansions(self.context.get('request'), expandable_fields):
+            if name not in self.fields:
+                # Left out by ?fields= / ?omit=.
+                continue
+            many = self.Meta.model._meta.get_field(name).many_to_many
+            self.fields[name] = expandable_fields[name](many=many, read_only=True)
+
+
+class ExpandQuerysetMixin:
+    """
+    For viewsets whose serializer uses ExpandableSerializerMixin: loads the expanded relations with
+    select_related (foreign keys) or prefetch_related (many-to-many), so an expanded list costs a
+    constant number of queries instead of one per row and relation.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        expandable_fields = serializer_class.Meta.expandable_fields
+        model = serializer_class.Meta.model
+
+        joined, prefetched = [], []
+        for name in requested_expansions(self.request, expandable_fields):
+            field = model._meta.get_field(name)
+            (prefetched if field.many_to_many else joined).append(name)
+            # The nested serializer lists the ids of its own many-to-many relations: prefetch them too.
+            nested_fields = expandable_fields[name]().fields
+            prefetched += [f'{name}__{relation.name}' for relation in field.related_model._meta.many_to_many
+                           if relation.name in nested_fields]
+        if joined:
+            queryset = queryset.select_related(*joined)
+        if prefetched:
+            queryset = queryset.prefetch_related(*prefetched)
+        return queryset
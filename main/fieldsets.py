@@ -0,0 +1,82 @@
+from typing import List, Optional, Set
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+from .filters import split_values
+
+
+def sparse_fieldset(request, names: List[str]) -> List[str]:
+    """
+    The serializer fields kept by "?fields=id,name" (only these) and "?omit=description"
+    (all but these), in their original order. Raises ValidationError for unknown names.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return names
+    fields = split_values(request.query_params.getlist('fields'))
+    omit = split_values(request.query_params.getlist('omit'))
+    unknown = [name for name in fields + omit if name not in names]
+    if unknown:
+        raise ValidationError({'fields': f'Unknown fields: {", ".join(unknown)}. Available: {", ".join(names)}.'})
+    return [name for name in names if (not fields or name in fields) and name not in omit]
+
+
+def model_columns(model, fields) -> Optional[Set[str]]:
+    """
+    Model fields to load for these serializer fields, for queryset.only(). None if some field
+    isn't a plain model field (dotted or "*" source, property...): then nothing can be left out.
+    """
+    columns = {model._meta.pk.name}
+    for field in fields:
+        if field.source == '*' or '.' in field.source:
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if model_field.concrete and not model_field.many_to_many:
+            columns.add(model_field.name)
+    return columns
+
+
+class SparseModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer that drops the fields left out by ?fields= / ?omit= of the request in its
+    context. Nested serializers have no request in their context and keep all their fields.
+
+    Example usage:
+    GET /api/students/?fields=id,first_name,last_name
+    GET /api/applications/?omit=description,pdf_file
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        kept = set(sparse_fieldset(self.context.get('request'), list(self.fields)))
+        for name in list(self.fields):
+            if name not in kept:
+                self.fields.pop(name)
+
+
+class SparseQuerysetMixin:
+    """
+    For viewsets with a SparseModelSerializer: when ?fields= or ?omit= narrows the serializer,
+    list and retrieve load only the matching columns with .only().
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params if self.request is not None else {}
+        if self.action not in ('list', 'retrieve') or not ('fields' in params or 'omit' in params):
+            return queryset
+
+        columns = model_columns(queryset.model, self.get_serializer().fields.values())
+        if columns is None:
+            return queryset
+        # Relations joined by select_related and the cursor ordering must be loaded as well.
+        if isinstance(queryset.query.select_related, dict):
+            columns |= set(queryset.query.select_related)
+        ordering = getattr(self.paginator, 'ordering', None) or ()
+        columns |= {name.lstrip('-') for name in ([ordering] if isinstance(ordering, str) else ordering)}
+        return queryset.only(*columns)
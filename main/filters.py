@@ -0,0 +1,81 @@
+from datetime import datetime, time, timedelta
+from typing import List, Optional
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .search import search_applications
+
+
+def start_of_day(value: str) -> datetime:
+    date = parse_date(value)
+    if date is None:
+        raise ValueError(f'"{value}" is not a YYYY-MM-DD date.')
+    return timezone.make_aware(datetime.combine(date, time.min))
+
+
+def split_values(values: Optional[List[str]]) -> List[str]:
+    """
+    Query parameters can be repeated or comma separated: "?status=done&status=incomplete" or
+    "?status=done,incomplete".
+    """
+    return [value.strip() for item in values or [] for value in item.split(',') if value.strip()]
+
+
+def filter_applications(queryset, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                        statuses: Optional[List[str]] = None, categories: Optional[List[str]] = None,
+                        students: Optional[List[str]] = None, executors: Optional[List[str]] = None,
+                        responsibles: Optional[List[str]] = None):
+    """
+    Narrows an Application queryset by creation date (YYYY-MM-DD, both days included), status,
+    category (id or name), student, executor and responsible (ids). Raises ValueError for
+    malformed values.
+
+    Dates become a created_at range rather than a __date lookup, so the (…, created_at) indexes apply.
+    """
+    if date_from:
+        queryset = queryset.filter(created_at__gte=start_of_day(date_from))
+    if date_to:
+        queryset = queryset.filter(created_at__lt=start_of_day(date_to) + timedelta(days=1))
+
+    statuses = split_values(statuses)
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+
+    categories = split_values(categories)
+    if categories:
+        ids = [int(value) for value in categories if value.isdigit()]
+        names = [value for value in categories if not value.isdigit()]
+        queryset = queryset.filter(Q(category_id__in=ids) | Q(category__name__in=names))
+
+    for field, values in (('student_id', students), ('executor_id', executors), ('responsible_id', responsibles)):
+        values = split_values(values)
+        if values:
+            if not all(value.isdigit() for value in values):
+                raise ValueError(f'"{field[:-3]}" must be a list of ids.')
+            queryset = queryset.filter(**{f'{field}__in': [int(value) for value in values]})
+
+    return queryset
+
+
+class ApplicationFilterBackend(BaseFilterBackend):
+    """
+    ?from=&to=&status=&category=&student=&executor=&responsible= for application endpoints, and
+    ?q= for a full-text search ordered by relevance.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        if params.get('q'):
+            queryset = search_applications(queryset, params['q'])
+        try:
+            return filter_applications(
+                queryset, params.get('from'), params.get('to'),
+                params.getlist('status'), params.getlist('category'), params.getlist('student'),
+                params.getlist('executor'), params.getlist('responsible'),
+            )
+        except ValueError as e:
+            raise ValidationError({'detail': str(e)}) from e
@@ -0,0 +1,122 @@
+from typing import Any, Dict, List, Optional
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Faculty, Grade, Speciality, Student, Subject, Teacher, TypeOfGrades
+
+
+# Grade relation -> model. faculty and speciality may be left out: the student's current ones are used.
+GRADE_RELATIONS = {
+    'student': Student,
+    'subject': Subject,
+    'grade_type': TypeOfGrades,
+    'teacher': Teacher,
+    'faculty': Faculty,
+    'speciality': Speciality,
+}
+REQUIRED_FIELDS = ('student', 'subject', 'grade_type', 'teacher', 'grade')
+# A grade is identified by (student, subject, grade_type); submitting it again overwrites these.
+UPSERT_FIELDS = ['faculty', 'speciality', 'grade', 'teacher', 'date']
+
+
+def is_id(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def parse_grade_date(value: Any) -> Optional[Any]:
+    if value is None:
+        return timezone.now()
+    if not isinstance(value, str):
+        return None
+    date = parse_datetime(value)
+    if date is None and parse_date(value) is not None:
+        date = parse_datetime(f'{value}T00:00:00')
+    if date is not None and timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def validate_grade_rows(rows: List[Dict[str, Any]], related: Dict[str, Dict[int, Any]]):
+    """
+    Checks every row against the related objects loaded by save_grades. Returns the unsaved
+    Grade objects and {row index: {field: message}}.
+    """
+    grades, errors, seen = [], {}, {}
+    for index, row in enumerate(rows):
+        row_errors = {}
+        if not isinstance(row, dict):
+            errors[index] = {'non_field_errors': 'Expected an object.'}
+            continue
+
+        for field, model in GRADE_RELATIONS.items():
+            value = row.get(field)
+            if value is None:
+                if field in REQUIRED_FIELDS:
+                    row_errors[field] = 'This field is required.'
+            elif not is_id(value):
+                row_errors[field] = 'Must be an id.'
+            elif value not in related[field]:
+                row_errors[field] = f'{model.__name__} {value} does not exist.'
+
+        value = row.get('grade')
+        if value is not None and not (is_id(value) and 0 <= value <= 100):
+            row_errors['grade'] = 'Must be an integer from 0 to 100.'
+        date = parse_grade_date(row.get('date'))
+        if date is None:
+            row_errors['date'] = 'Must be a YYYY-MM-DD date or an ISO 8601 datetime.'
+
+        if not row_errors:
+            key = (row['student'], row['subject'], row['grade_type'])
+            if key in seen:
+                row_errors['non_field_errors'] = f'Same student, subject and grade type as row {seen[key]}.'
+            seen.setdefault(key, index)
+        if row_errors:
+            errors[index] = row_errors
+            continue
+
+        student = related['student'][row['student']]
+        grades.append(Grade(
+            student_id=row['student'], subject_id=row['subject'], grade_type_id=row['grade_type'],
+            teacher_id=row['teacher'], grade=row['grade'], date=date,
+            faculty_id=row.get('faculty') or student.current_faculty_id,
+            speciality_id=row.get('speciality') or student.speciality_id,
+        ))
+    return grades, errors
+
+
+def save_grades(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Creates or overwrites grades by (student, subject, grade_type) in one transaction, with one
+    in_bulk() lookup per relation and a single INSERT ... ON CONFLICT DO UPDATE. Nothing is saved
+    if any row is invalid.
+
+    Returns {"created": n, "updated": n, "errors": {row index: {field: message}}}.
+
+    Example usage:
+    save_grades([{"student": 1, "subject": 2, "grade_type": 3, "teacher": 4, "grade": 85}])
+    """
+    related = {}
+    for field, model in GRADE_RELATIONS.items():
+        ids = {row.get(field) for row in rows if isinstance(row, dict) and is_id(row.get(field))}
+        # Only the student's columns are used, to fill in faculty and speciality.
+        columns = ('id', 'current_faculty', 'speciality') if model is Student else ('id',)
+        queryset = model.objects.only(*columns)
+        related[field] = queryset.in_bulk(ids) if ids else {}
+
+    grades, errors = validate_grade_rows(rows, related)
+    if errors:
+        return {'created': 0, 'updated': 0, 'errors': errors}
+
+    with transaction.atomic():
+        keys = {(grade.student_id, grade.subject_id, grade.grade_type_id) for grade in grades}
+        existing = keys & set(Grade.objects.filter(
+            student_id__in={key[0] for key in keys}, subject_id__in={key[1] for key in keys},
+            grade_type_id__in={key[2] for key in keys},
+        ).values_list('student_id', 'subject_id', 'grade_type_id'))
+        # Grades submitted concurrently by someone else are overwritten by the ON CONFLICT clause too.
+        Grade.objects.bulk_create(grades, update_conflicts=True,
+                                  unique_fields=['student', 'subject', 'grade_type'], update_fields=UPSERT_FIELDS)
+
+    return {'created': len(grades) - len(existing), 'updated': len(existing), 'errors': {}}
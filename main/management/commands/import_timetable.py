@@ -0,0 +1,60 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.schedule_import import ScheduleImport
+from main.timetable_registry import get_registry
+
+
+class Command(BaseCommand):
+    help = 'Imports the Excel timetable into Schedule rows under a new ScheduleVersion.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', nargs='?',
+                            help='Workbook to import. Defaults to the workbook of --source. '
+                                 'The rows are stored under --source either way.')
+        parser.add_argument('--source', help='Key of a TIMETABLE_SOURCES entry. Defaults to the first one.')
+        parser.add_argument('--sheet', action='append', dest='sheets',
+                            help='Import only this sheet. Can be given several times.')
+        parser.add_argument('--version-number', help='Name of the new ScheduleVersion.')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of processes used to read and clean the sheets.')
+        parser.add_argument('--force', action='store_true',
+                            help='Compare every sheet row by row, even if its fingerprint did not change.')
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        try:
+            source = get_registry().source(options['source'])
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+
+        schedule_import = ScheduleImport(
+            file=options['file'] or source.file,
+            source=source.key,
+            sheet_names=options['sheets'],
+            version_number=options['version_number'],
+            chunk_size=options['chunk_size'],
+            max_workers=options['workers'],
+            force=options['force'],
+        )
+
+        try:
+            version = schedule_import.run()
+        except (FileNotFoundError, ValueError) as e:
+            raise CommandError(str(e)) from e
+
+        for entry in schedule_import.skipped:
+            self.stderr.write(f'Skipped {entry}')
+
+        if version is None:
+            self.stdout.write(f'No sheet changed ({perf_counter() - started:.2f}s).')
+            return
+
+        for sheet_name, changes in version.summary['sheets'].items():
+            self.stdout.write(f'{sheet_name}: +{changes["inserted"]} -{changes["deleted"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported version "{version}": {version.summary["inserted"]} rows inserted, '
+            f'{version.summary["deleted"]} deleted, {len(version.summary["unchanged"])} sheets unchanged '
+            f'in {perf_counter() - started:.2f}s.'))
@@ -0,0 +1,77 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from time import perf_counter, sleep
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.pdf import (claim_jobs, fail_jobs, finish_jobs, init_render_worker, render_application,
+                      requeue_stale_jobs)
+
+
+class Command(BaseCommand):
+    help = 'Renders the queued application PDFs in a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'PDF_RENDER_WORKERS', 2))
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Applications claimed at once. Defaults to twice the number of workers.')
+        parser.add_argument('--poll-interval', type=float, default=2,
+                            help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty.')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        batch_size = options['batch_size'] or workers * 2
+        max_attempts = getattr(settings, 'PDF_JOB_MAX_ATTEMPTS', 3)
+        timeout = getattr(settings, 'PDF_JOB_TIMEOUT', 600)
+
+        requeued = requeue_stale_jobs(timeout)
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale jobs.')
+
+        rendered = unchanged = failed = 0
+        render_seconds = []
+        started = perf_counter()
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'),
+                                       initializer=init_render_worker)
+        try:
+            while True:
+                claimed = claim_jobs(batch_size)
+                if not claimed:
+                    if options['once']:
+                        break
+                    sleep(options['poll_interval'])
+                    continue
+
+                futures = {executor.submit(render_application, application_id): application_id
+                           for application_id in claimed}
+                for future in as_completed(futures):
+                    application_id = futures[future]
+                    try:
+                        result = future.result()
+                        finish_jobs(application_id, claimed[application_id], result)
+                        if result is not None and result['rendered']:
+                            rendered += 1
+                            render_seconds.append(result['seconds'])
+                        else:
+                            unchanged += 1
+                        if result is not None and options['verbosity'] > 1:
+                            self.stdout.write(
+                                f'Application {application_id}: '
+                                f'{"rendered" if result["rendered"] else "unchanged"} in {result["seconds"] * 1000:.0f}ms')
+                    except Exception as e:
+                        self.stderr.write(f'Application {application_id}: {e}')
+                        failed += fail_jobs(application_id, claimed[application_id], str(e), max_attempts)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+        elapsed = perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {rendered} PDFs ({unchanged} unchanged, {failed} failed) in {elapsed:.2f}s.'))
+        if render_seconds:
+            self.stdout.write(
+                f'Render time: {sum(render_seconds) / len(render_seconds) * 1000:.0f}ms average, '
+                f'{max(render_seconds) * 1000:.0f}ms max, {rendered / elapsed:.1f} PDFs/s.')
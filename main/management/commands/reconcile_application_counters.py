@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from main.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = ('Recounts the application counters (ApplicationCounter) from the Application table. '
+            'Run it periodically (e.g. from cron) to fix drift from updates that bypass signals.')
+
+    def handle(self, *args, **options):
+        differences = reconcile_counters()
+        for key, difference in sorted(differences.items()):
+            self.stdout.write(f'{key}: off by {difference:+d}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(differences)} counters fixed.' if differences else 'All counters are correct.'))
@@ -0,0 +1,86 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from itertools import islice
+from multiprocessing import get_context
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.models import Application
+from main.filters import filter_applications
+from main.pdf import init_render_worker, render_applications
+
+
+class Command(BaseCommand):
+    help = ('Regenerates the PDFs of existing applications, e.g. after a template change. '
+            'Applications whose PDF already matches the template are skipped, so an interrupted '
+            'run can simply be started again.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='Created on or after this date (YYYY-MM-DD).')
+        parser.add_argument('--to', dest='date_to', help='Created on or before this date (YYYY-MM-DD).')
+        parser.add_argument('--status', action='append', dest='statuses',
+                            help='Only applications with this status. Can be given several times.')
+        parser.add_argument('--category', action='append', dest='categories',
+                            help='Category id or name. Can be given several times.')
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'PDF_RENDER_WORKERS', 2))
+        parser.add_argument('--batch-size', type=int, default=20,
+                            help='Applications sent to a worker at once.')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Rows read from the database at once. Progress is reported every chunk.')
+        parser.add_argument('--force', action='store_true', help='Render even if the PDF did not change.')
+
+    def get_queryset(self, options):
+        try:
+            return filter_applications(Application.objects.all(), options['date_from'], options['date_to'],
+                                       options['statuses'], options['categories']).order_by('id')
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+
+    def handle(self, *args, **options):
+        queryset = self.get_queryset(options)
+        total = queryset.count()
+        if not total:
+            self.stdout.write('No applications match.')
+            return
+
+        workers = max(1, options['workers'])
+        ids = queryset.values_list('id', flat=True).iterator(chunk_size=options['chunk_size'])
+        batches = iter(lambda: list(islice(ids, options['batch_size'])), [])
+
+        self.done = self.rendered = self.failed = 0
+        self.started = perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'),
+                                 initializer=init_render_worker) as executor:
+            # At most two batches per worker are in flight, so memory stays flat on big querysets.
+            running = set()
+            for batch in batches:
+                running.add(executor.submit(render_applications, batch, options['force']))
+                if len(running) >= workers * 2:
+                    finished, running = wait(running, return_when=FIRST_COMPLETED)
+                    self.save_results(finished, total, options['chunk_size'])
+            self.save_results(as_completed(running), total, options['chunk_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{self.rendered} PDFs rendered, {self.done - self.rendered - self.failed} unchanged, '
+            f'{self.failed} failed in {perf_counter() - self.started:.2f}s.'))
+
+    def save_results(self, futures, total, report_every):
+        # Every batch is written as soon as it is done: a run interrupted later finds its PDFs up to date.
+        for future in futures:
+            reported, updates = self.done // report_every, []
+            for result in future.result():
+                self.done += 1
+                if 'error' in result:
+                    self.failed += 1
+                    self.stderr.write(f'Application {result["id"]}: {result["error"]}')
+                    continue
+                self.rendered += result['rendered']
+                updates.append(Application(
+                    id=result['id'], pdf_file=result['name'], pdf_hash=result['hash'], pdf_status='ready'))
+
+            # bulk_update does not call save(), so no new render jobs are queued.
+            Application.objects.bulk_update(updates, ['pdf_file', 'pdf_hash', 'pdf_status'])
+            if self.done // report_every > reported or self.done == total:
+                elapsed = perf_counter() - self.started
+                self.stdout.write(f'{self.done}/{total} applications ({self.done / elapsed:.1f}/s)')
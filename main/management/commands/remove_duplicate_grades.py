@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max
+
+from main.models import Grade
+
+
+class Command(BaseCommand):
+    help = ('Lists grades that share a student, subject and grade type, and with --apply deletes all but '
+            'the most recently added one of each. Migration 0013 (one grade per type) refuses to run '
+            'while such duplicates exist.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--apply', action='store_true',
+                            help='Delete the older duplicates. Without it nothing is changed.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            duplicates = (Grade.objects.values('student_id', 'subject_id', 'grade_type_id')
+                          .annotate(total=Count('id'), latest_id=Max('id')).filter(total__gt=1)
+                          .order_by('student_id', 'subject_id', 'grade_type_id'))
+            removed = 0
+            for key in duplicates:
+                older = Grade.objects.filter(
+                    student_id=key['student_id'], subject_id=key['subject_id'], grade_type_id=key['grade_type_id'],
+                ).exclude(id=key['latest_id']).order_by('id')
+                for grade in older.values('id', 'grade', 'date'):
+                    # Everything needed to restore a deleted grade by hand ends up in the output.
+                    self.stdout.write(
+                        f'student={key["student_id"]} subject={key["subject_id"]} grade_type={key["grade_type_id"]}: '
+                        f'{"deleting" if options["apply"] else "would delete"} grade {grade["id"]} '
+                        f'({grade["grade"]}, {grade["date"].isoformat()}), keeping {key["latest_id"]}')
+                if options['apply']:
+                    removed += older.delete()[0]
+
+        if not duplicates:
+            self.stdout.write(self.style.SUCCESS('No duplicate grades.'))
+        elif options['apply']:
+            self.stdout.write(self.style.SUCCESS(f'{removed} duplicate grades deleted.'))
+        else:
+            self.stdout.write('Nothing changed. Run again with --apply to delete them.')
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.models import ScheduleVersion
+from main.schedule_query import ScheduleIntervals, stored_slots
+from main.timetable_registry import get_registry
+
+
+class Command(BaseCommand):
+    help = 'Reports double-booked teachers and rooms in the imported timetable.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', help='Key of a TIMETABLE_SOURCES entry. Defaults to the source of '
+                                             '--schedule-version, or else to the first one.')
+        parser.add_argument('--schedule-version', type=int, dest='version_id',
+                            help='Only report clashes involving the sheets changed by this ScheduleVersion.')
+        parser.add_argument('--kind', choices=['teacher', 'room', 'all'], default='all')
+        parser.add_argument('--day', help='Only report clashes on this day, e.g. "Tuesday".')
+
+    def handle(self, *args, **options):
+        sheets, source = None, options['source']
+        if source is not None:
+            try:
+                source = get_registry().source(source).key
+            except ValueError as e:
+                raise CommandError(str(e)) from e
+        if options['version_id'] is not None:
+            try:
+                version = ScheduleVersion.objects.get(pk=options['version_id'])
+            except ScheduleVersion.DoesNotExist as e:
+                raise CommandError(f'ScheduleVersion {options["version_id"]} does not exist.') from e
+            if source is not None and source != version.source:
+                raise CommandError(f'ScheduleVersion {version.pk} was imported from "{version.source}", not "{source}".')
+            sheets = {name.strip() for name in version.summary.get('sheets', {})}
+            source = version.source
+
+        if source is None:
+            source = get_registry().source().key
+        # Lessons of different workbooks (semesters, campuses) never clash with each other.
+        intervals = ScheduleIntervals(stored_slots(source))
+        kinds = ['teacher', 'room'] if options['kind'] == 'all' else [options['kind']]
+        total = 0
+
+        try:
+            clashes = [(kind, clash) for kind in kinds for clash in intervals.clashes(kind, options['day'])]
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+
+        for kind, clash in clashes:
+            if sheets is not None and not any(
+                    sheets.intersection(lesson['Sheets']) for lesson in clash['lessons']):
+                continue
+
+            total += 1
+            first, second = clash['lessons']
+            self.stdout.write(
+                f'{clash["day"]} {kind} {clash[kind]}: '
+                f'{first["Time"]} {first["Subject"]} ({", ".join(first["Sheets"])}) / '
+                f'{second["Time"]} {second["Subject"]} ({", ".join(second["Sheets"])})')
+
+        self.stdout.write(self.style.SUCCESS(f'{total} clashes found.') if not total
+                          else self.style.WARNING(f'{total} clashes found.'))
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_schedule_import'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scheduleversion',
+            name='summary',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.CreateModel(
+            name='ScheduleSheet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sheet_name', models.CharField(max_length=100, unique=True)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('speciality', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.speciality')),
+                ('version', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.scheduleversion')),
+            ],
+        ),
+    ]
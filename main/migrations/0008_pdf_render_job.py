@@ -0,0 +1,46 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def mark_existing_pdfs(apps, schema_editor):
+    # Заявления с уже созданным PDF готовы, для остальных ставим задачу в очередь.
+    Application = apps.get_model('main', 'Application')
+    PdfRenderJob = apps.get_model('main', 'PdfRenderJob')
+
+    with_pdf = Application.objects.exclude(pdf_file='').exclude(pdf_file__isnull=True)
+    with_pdf.update(pdf_status='ready')
+    PdfRenderJob.objects.bulk_create([
+        PdfRenderJob(application_id=application_id)
+        for application_id in Application.objects.exclude(pk__in=with_pdf).values_list('id', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_schedule_sheet'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='pdf_status',
+            field=models.CharField(choices=[('pending', 'В очереди'), ('ready', 'Готов'), ('failed', 'Ошибка')], default='pending', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='PdfRenderJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], db_index=True, default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('application', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdf_jobs', to='main.application')),
+            ],
+        ),
+        migrations.RunPython(mark_existing_pdfs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_pdf_render_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='pdf_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
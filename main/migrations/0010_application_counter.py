@@ -0,0 +1,41 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:48
+
+from django.db import migrations, models
+
+
+def fill_counters(apps, schema_editor):
+    Application = apps.get_model('main', 'Application')
+    ApplicationCounter = apps.get_model('main', 'ApplicationCounter')
+    dimensions = {'status': 'status', 'category': 'category_id',
+                  'executor': 'executor_id', 'responsible': 'responsible_id'}
+
+    ApplicationCounter.objects.bulk_create([
+        ApplicationCounter(dimension=dimension, key='' if row[attname] is None else str(row[attname]),
+                           count=row['total'])
+        for dimension, attname in dimensions.items()
+        for row in Application.objects.order_by().values(attname).annotate(total=models.Count('id'))
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_application_pdf_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('status', 'Статус'), ('category', 'Категория'), ('executor', 'Исполнитель'), ('responsible', 'Ответственный')], max_length=20)),
+                ('key', models.CharField(blank=True, max_length=100)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='applicationcounter',
+            constraint=models.UniqueConstraint(fields=('dimension', 'key'), name='application_counter_unique'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
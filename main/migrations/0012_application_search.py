@@ -0,0 +1,77 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:10
+
+from django.db import migrations
+
+
+# Полнотекстовый индекс по названию и описанию заявлений.
+# SQLite: внешняя таблица FTS5 поверх main_application, синхронизируется триггерами.
+# PostgreSQL: GIN-индекс по тому же выражению to_tsvector, что использует main/search.py.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE main_application_fts USING fts5(
+        title, description,
+        content='main_application', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER main_application_fts_insert AFTER INSERT ON main_application BEGIN
+        INSERT INTO main_application_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER main_application_fts_delete AFTER DELETE ON main_application BEGIN
+        INSERT INTO main_application_fts(main_application_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    # Индекс меняется только при изменении текста, а не статуса или PDF.
+    """
+    CREATE TRIGGER main_application_fts_update AFTER UPDATE OF title, description ON main_application BEGIN
+        INSERT INTO main_application_fts(main_application_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO main_application_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO main_application_fts(main_application_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS main_application_fts_insert',
+    'DROP TRIGGER IF EXISTS main_application_fts_delete',
+    'DROP TRIGGER IF EXISTS main_application_fts_update',
+    'DROP TABLE IF EXISTS main_application_fts',
+]
+
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX application_search_idx ON main_application USING gin (
+        to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))
+    )
+    """,
+]
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS application_search_idx',
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_application_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
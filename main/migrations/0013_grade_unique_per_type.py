@@ -0,0 +1,35 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:59
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_grades(apps, schema_editor):
+    # Оценки не удаляются молча: сначала дубликаты нужно разобрать командой remove_duplicate_grades.
+    Grade = apps.get_model('main', 'Grade')
+    duplicates = list(
+        Grade.objects.values_list('student_id', 'subject_id', 'grade_type_id')
+        .annotate(total=Count('id')).filter(total__gt=1).order_by('student_id', 'subject_id', 'grade_type_id')
+    )
+    if duplicates:
+        keys = ', '.join(f'(student={student}, subject={subject}, grade_type={grade_type}): {total}'
+                         for student, subject, grade_type, total in duplicates[:20])
+        raise RuntimeError(
+            f'{len(duplicates)} (student, subject, grade_type) keys have several grades: {keys}. '
+            f'Review them with "manage.py remove_duplicate_grades" and delete the older ones with '
+            f'"manage.py remove_duplicate_grades --apply" before migrating.')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0012_application_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_grades, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='grade',
+            constraint=models.UniqueConstraint(fields=('student', 'subject', 'grade_type'), name='grade_unique_per_type'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def assign_default_source(apps, schema_editor):
+    # До этой миграции импортировался только один файл: первый из TIMETABLE_SOURCES.
+    sources = getattr(settings, 'TIMETABLE_SOURCES', None) or [{'key': 'default'}]
+    for model_name in ('Schedule', 'ScheduleSheet', 'ScheduleVersion'):
+        apps.get_model('main', model_name).objects.update(source=sources[0]['key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_grade_unique_per_type'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='schedule',
+            name='schedule_speciality_idx',
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='source',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='schedulesheet',
+            name='source',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='scheduleversion',
+            name='source',
+            field=models.CharField(blank=True, db_index=True, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='schedulesheet',
+            name='sheet_name',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.RunPython(assign_default_source, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['source', 'speciality', 'day_of_week', 'time_start'], name='schedule_speciality_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='schedulesheet',
+            constraint=models.UniqueConstraint(fields=('source', 'sheet_name'), name='schedule_sheet_unique_per_source'),
+        ),
+    ]
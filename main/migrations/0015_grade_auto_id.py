@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_schedule_source'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='grade',
+            name='id',
+            field=models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.6 on 2026-10-18 20:12
+
+from django.db import migrations, models
+
+
+def mark_not_generated(apps, schema_editor):
+    # "pending" без задачи в очереди означал PDF, который ещё ни разу не создавался.
+    Application = apps.get_model('main', 'Application')
+    PdfRenderJob = apps.get_model('main', 'PdfRenderJob')
+    queued = PdfRenderJob.objects.filter(status__in=['pending', 'running']).values('application_id')
+    Application.objects.filter(pdf_status='pending').exclude(id__in=queued).update(pdf_status='not_generated')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_grade_auto_id'),
+    ]
+
+    operations = [
+        # choices и default живут только в Python: схема не меняется. Обычный AlterField пересоздал бы
+        # main_application в SQLite вместе с триггерами полнотекстового индекса (0012).
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name='application',
+                name='pdf_status',
+                field=models.CharField(choices=[('not_generated', 'Не создан'), ('pending', 'В очереди'), ('ready', 'Готов'), ('failed', 'Ошибка')], default='not_generated', max_length=20),
+            ),
+        ]),
+        migrations.RunPython(mark_not_generated, migrations.RunPython.noop),
+    ]
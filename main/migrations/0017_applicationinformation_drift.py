@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-18 20:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Модель ApplicationInformation изменили без миграции: step_number удалён, title стал длиннее.
+    # Отдельно от импорта расписания, чтобы удаление столбца было видно при обновлении базы.
+
+    dependencies = [
+        ('main', '0016_application_pdf_not_generated'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='applicationinformation',
+            name='step_number',
+        ),
+        migrations.AlterField(
+            model_name='applicationinformation',
+            name='description',
+            field=models.TextField(),
+        ),
+        migrations.AlterField(
+            model_name='applicationinformation',
+            name='title',
+            field=models.CharField(max_length=2000),
+        ),
+    ]
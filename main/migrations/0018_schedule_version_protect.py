@@ -0,0 +1,24 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0017_applicationinformation_drift'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='schedule',
+            name='version',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='main.scheduleversion'),
+        ),
+        migrations.AlterField(
+            model_name='schedulesheet',
+            name='version',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='main.scheduleversion'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-18 20:58
+
+from django.db import migrations, models
+
+
+def mark_stale(apps, schema_editor):
+    # Раньше правка заявления с уже созданным PDF тоже ставила "not_generated".
+    Application = apps.get_model('main', 'Application')
+    Application.objects.filter(pdf_status='not_generated').exclude(pdf_file='').exclude(
+        pdf_file__isnull=True).update(pdf_status='stale')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0018_schedule_version_protect'),
+    ]
+
+    operations = [
+        # Как и в 0016, меняются только choices: схема та же, триггеры полнотекстового индекса не трогаем.
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name='application',
+                name='pdf_status',
+                field=models.CharField(choices=[('not_generated', 'Не создан'), ('stale', 'Устарел'), ('pending', 'В очереди'), ('ready', 'Готов'), ('failed', 'Ошибка')], default='not_generated', max_length=20),
+            ),
+        ]),
+        migrations.RunPython(mark_stale, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models, migrations
+from django.db import models, migrations, transaction
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 import datetime
@@ -6,10 +6,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _
 from django.core.files.base import ContentFile
-from django.template.loader import render_to_string
-from io import BytesIO
 from django.core.files import File
-from xhtml2pdf import pisa
 import os
 from django.conf import settings
 from django.conf.urls.static import static
@@ -50,11 +47,12 @@ class Speciality(models.Model):
     
 class Teacher(models.Model):
     first_name = models.CharField(max_length=50)
-    middle_name = models.CharField(max_length=50)
+    middle_name = models.CharField(max_length=50, blank=True)
     last_name = models.CharField(max_length=50)
-    date_of_birth = models.DateField()
-    email = models.EmailField()
-    phone = models.CharField(max_length=20)
+    # Преподаватели, импортированные из расписания, известны только по фамилии и инициалам.
+    date_of_birth = models.DateField(null=True, blank=True)
+    email = models.EmailField(blank=True)
+    phone = models.CharField(max_length=20, blank=True)
 
     def __str__(self):
         return f"{self.id} {self.last_name} {self.first_name} {self.middle_name}"
@@ -66,7 +64,7 @@ class Teacher(models.Model):
 
 
 class Subject(models.Model):
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=500)
     is_active = models.BooleanField(default=True)
 
     def __str__(self):
@@ -148,6 +146,13 @@ class Application(models.Model):
         ('done', 'Исполнено'),
         ('in_progress', 'В процессе'),
     ]
+    PDF_STATUS_CHOICES = [
+        ('not_generated', 'Не создан'),
+        ('stale', 'Устарел'),
+        ('pending', 'В очереди'),
+        ('ready', 'Готов'),
+        ('failed', 'Ошибка'),
+    ]
     
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name="applications")
     title = models.CharField(max_length=500)
@@ -160,42 +165,94 @@ class Application(models.Model):
     # deadline = models.DateField(default=timezone.now)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='in_process')
     pdf_file = models.FileField(upload_to='', null=True, blank=True)
+    pdf_status = models.CharField(max_length=20, choices=PDF_STATUS_CHOICES, default='not_generated')
+    # sha256 HTML, из которого сделан pdf_file: если HTML не изменился, PDF не пересоздаётся.
+    pdf_hash = models.CharField(max_length=64, blank=True)
+
+    # Поля, которые пишет сам рендер PDF: их сохранение не ставит новую задачу.
+    PDF_OWN_FIELDS = {'pdf_file', 'pdf_status', 'pdf_hash'}
+
+    class Meta:
+        # Под фильтры и курсорную пагинацию /api/applications/ (сортировка по created_at, id).
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='application_created_idx'),
+            models.Index(fields=['student', 'created_at', 'id'], name='application_student_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='application_status_idx'),
+            models.Index(fields=['executor', 'created_at', 'id'], name='application_executor_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} {self.description}"
 
     def save(self, *args, **kwargs):
-        
-        super().save(*args, **kwargs)
-
-        
-        pdf_content = render_to_string('application_pdf_template.html', {'application': self})
-        buffer = BytesIO()
-        pdf = pisa.pisaDocument(BytesIO(pdf_content.encode("UTF-8")), buffer)
+        # Без APPLICATION_PDF_EAGER PDF создаётся при первом скачивании (/api/applications/<id>/pdf/).
+        # Иначе он рендерится в фоне (manage.py process_pdf_jobs), здесь только ставим задачу в очередь.
+        update_fields = kwargs.get('update_fields')
+        changes_content = update_fields is None or not set(update_fields) <= self.PDF_OWN_FIELDS
+        enqueue = changes_content and getattr(settings, 'APPLICATION_PDF_EAGER', False)
+        if changes_content:
+            # До выполнения задачи (или до следующего скачивания) сохранённый PDF устаревший:
+            # статус сохраняется тем же UPDATE. Файл "stale" остаётся на диске до пересоздания.
+            if enqueue:
+                self.pdf_status = 'pending'
+            else:
+                self.pdf_status = 'stale' if self.pdf_file else 'not_generated'
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'pdf_status'}
+
+        # Счётчики заявлений (ApplicationCounter) обновляются сигналом post_save в той же транзакции.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+        if enqueue:
+            PdfRenderJob.objects.create(application=self)
+
+
+class ApplicationCounter(models.Model):
+    """
+    Количество заявлений по статусу, категории, исполнителю и ответственному.
+    Обновляется сигналами при сохранении и удалении заявлений (main/counters.py).
+    """
+    DIMENSION_CHOICES = [
+        ('status', 'Статус'),
+        ('category', 'Категория'),
+        ('executor', 'Исполнитель'),
+        ('responsible', 'Ответственный'),
+    ]
 
-        if pdf.err:
-            print("Ошибка при создании PDF")
-            return
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    # Значение статуса или id; пустая строка - не указано.
+    key = models.CharField(max_length=100, blank=True)
+    count = models.IntegerField(default=0)
 
-        
-        today_str = timezone.now().strftime('%Y-%m-%d')
-        pdf_folder = os.path.join(settings.MEDIA_ROOT, 'applications', str(self.student.id), today_str, str(self.id))
-        os.makedirs(pdf_folder, exist_ok=True)
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key'], name='application_counter_unique'),
+        ]
 
-        pdf_filename = f'application_{self.id}.pdf'
-        pdf_path = os.path.join(pdf_folder, pdf_filename)
+    def __str__(self):
+        return f"{self.dimension}={self.key}: {self.count}"
 
-        
-        with open(pdf_path, 'wb') as pdf_file:
-            pdf_file.write(buffer.getvalue())
 
-        buffer.close()
+class PdfRenderJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Готово'),
+        ('failed', 'Ошибка'),
+    ]
 
+    application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='pdf_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
 
-        self.pdf_file.name = pdf_path
-        super().save(update_fields=["pdf_file"])
+    def __str__(self):
+        return f"PDF #{self.application_id} ({self.status})"
 
-        
 
 # -------------------------
 
@@ -245,7 +302,6 @@ class Student(models.Model):
     
 
 class Grade(models.Model):
-    id = models.IntegerField(primary_key=True)
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
     faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE, default=1)
@@ -255,6 +311,12 @@ class Grade(models.Model):
     teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE)
     date = models.DateTimeField()
 
+    class Meta:
+        constraints = [
+            # Одна оценка каждого типа по предмету: повторная отправка перезаписывает её (/api/grades/bulk/).
+            models.UniqueConstraint(fields=['student', 'subject', 'grade_type'], name='grade_unique_per_type'),
+        ]
+
     def __str__(self):
         return f"{self.student.last_name} - {self.grade_type.title}: {self.subject}"
 
@@ -320,23 +382,60 @@ class DayOfWeek(models.Model):
 
 class ScheduleVersion(models.Model):
     version_number = models.CharField(max_length=50)
+    # Ключ файла расписания из TIMETABLE_SOURCES (семестр, кампус), из которого сделан импорт.
+    source = models.CharField(max_length=50, blank=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Что поменялось при импорте: {"sheets": {лист: {"inserted": n, "deleted": n}}, ...}
+    summary = models.JSONField(default=dict, blank=True)
 
     def __str__(self):
         return self.version_number
 
 
+class ScheduleSheet(models.Model):
+    """
+    Fingerprint of the last imported content of one timetable sheet.
+    """
+    source = models.CharField(max_length=50, blank=True)
+    sheet_name = models.CharField(max_length=100)
+    speciality = models.ForeignKey(Speciality, on_delete=models.CASCADE)
+    fingerprint = models.CharField(max_length=64)
+    # PROTECT: неизменившиеся листы остаются на версии, которая их импортировала.
+    version = models.ForeignKey(ScheduleVersion, on_delete=models.PROTECT)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # В разных файлах (семестрах) листы называются одинаково.
+            models.UniqueConstraint(fields=['source', 'sheet_name'], name='schedule_sheet_unique_per_source'),
+        ]
+
+    def __str__(self):
+        return f'{self.source}: {self.sheet_name}' if self.source else self.sheet_name
+
+
 class Schedule(models.Model):
     date = models.DateField(default=datetime.date.today)
     day_of_week = models.ForeignKey(DayOfWeek, on_delete=models.CASCADE)
     time_start = models.TimeField()
     time_end = models.TimeField()
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
-    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE)
-    room = models.CharField(max_length=20)
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, null=True, blank=True)
+    # Ячейка "Teacher" из Excel как есть: в ней бывает несколько преподавателей.
+    teacher_display = models.CharField(max_length=255, blank=True)
+    room = models.CharField(max_length=255)
     speciality = models.ForeignKey(Speciality, on_delete=models.CASCADE)
     language = models.ForeignKey(Language, on_delete=models.CASCADE)
-    version = models.ForeignKey(ScheduleVersion, on_delete=models.CASCADE)
+    # Импорт добавляет только новые строки, остальные ссылаются на версию, в которой появились.
+    # PROTECT: удаление старой версии не должно удалять действующее расписание.
+    version = models.ForeignKey(ScheduleVersion, on_delete=models.PROTECT)
+    # Файл расписания (ключ из TIMETABLE_SOURCES): у специальности своё расписание в каждом семестре.
+    source = models.CharField(max_length=50, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['source', 'speciality', 'day_of_week', 'time_start'], name='schedule_speciality_idx'),
+        ]
 
     def __str__(self):
         return f"{self.day_of_week} {self.time_start}-{self.time_end} {self.subject} ({self.teacher})"
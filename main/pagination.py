@@ -0,0 +1,111 @@
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+# No endpoint returns more rows than this in one response, whatever the client asks for.
+MAX_PAGE_SIZE = 200
+
+
+class ReferencePagination(LimitOffsetPagination):
+    """
+    Default for the small reference tables (faculties, subjects, statuses...): ?limit=&offset=,
+    PAGE_SIZE rows by default.
+    Querysets without an ordering are ordered by primary key, so pages don't overlap or skip rows.
+    """
+
+    max_limit = MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not queryset.ordered:
+            queryset = queryset.order_by('pk')
+        return super().paginate_queryset(queryset, request, view)
+
+
+class LargeTableCursorPagination(CursorPagination):
+    """
+    Base for large tables that mostly grow (grades, schedules): the cursor encodes the position in
+    "ordering", so every page is an index range scan, however deep, and rows added between
+    requests don't shift the pages. ?page_size= is capped at MAX_PAGE_SIZE.
+    """
+
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class ApplicationCursorPagination(LargeTableCursorPagination):
+    """
+    Newest applications first. The cursor encodes the position in (created_at, id) order, so pages
+    stay stable while new applications arrive, and every page is an index range scan.
+
+    DRF keeps only the first ordering field in the cursor and steps over equal values with an
+    offset, which skips or repeats rows when applications with the same created_at are added or
+    removed between requests. Here the cursor holds every ordering field of the last row, and the
+    next page starts strictly after that (created_at, id) pair.
+    """
+
+    ordering = ('-created_at', '-id')
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = [instance[field.lstrip('-')] if isinstance(instance, dict) else getattr(instance, field.lstrip('-'))
+                  for field in ordering]
+        return json.dumps([str(value) for value in values])
+
+    def decode_cursor(self, request):
+        # The parent class would filter on the first ordering field only: paginate_queryset()
+        # applies the position itself, and the parent pages from the start of the filtered queryset.
+        cursor = self.full_cursor(request)
+        return cursor._replace(position=None) if cursor is not None else None
+
+    def full_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        try:
+            values = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.ordering = self.get_ordering(request, queryset, view)
+        cursor = self.full_cursor(request)
+        if cursor is not None and cursor.position is not None:
+            queryset = queryset.filter(self.after_position(json.loads(cursor.position), cursor.reverse))
+
+        page = super().paginate_queryset(queryset, request, view)
+        if cursor is not None and cursor.position is not None:
+            self.cursor = cursor
+            # There are rows on the other side of the position, whichever way the page was read.
+            if cursor.reverse:
+                self.has_next, self.next_position = True, cursor.position
+            else:
+                self.has_previous, self.previous_position = True, cursor.position
+            self.display_page_controls = self.template is not None
+        return page
+
+    def after_position(self, values, reverse):
+        """
+        Rows that come after the position in the ordering (before it if reverse):
+        (a < x) OR (a = x AND b < y) for ('-a', '-b').
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+
+class ApplicationSearchPagination(ReferencePagination):
+    """
+    ?q= results of the applications endpoint, ordered by relevance: paged with ?limit=&offset=
+    and with a "count", since a relevance order has no stable position for a cursor.
+    """
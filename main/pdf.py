@@ -0,0 +1,303 @@
+import csv
+import os
+from datetime import timedelta
+from hashlib import sha256
+from io import BytesIO
+from tempfile import NamedTemporaryFile
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.db.models import F
+from django.template.loader import get_template
+from django.utils import timezone
+from reportlab.lib.fonts import addMapping
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from xhtml2pdf import default, pisa
+
+
+# Models are looked up through "apps" in this module: spawned render workers import it
+# before Django is set up.
+
+PDF_TEMPLATE = 'application_pdf_template.html'
+
+PDF_FONT_FAMILY = 'DejaVu Sans'
+# (bold, italic) -> font file in main/static/fonts
+PDF_FONTS = {
+    (0, 0): 'DejaVuSans.ttf',
+    (1, 0): 'DejaVuSans-Bold.ttf',
+    (0, 1): 'DejaVuSans-Oblique.ttf',
+    (1, 1): 'DejaVuSans-BoldOblique.ttf',
+}
+
+_template = None
+
+
+def prepare_renderer():
+    """
+    Compiles the PDF template and registers the fonts once per process and returns the template.
+    With @font-face in the template, xhtml2pdf would parse the font files again on every render.
+    """
+    global _template
+    if _template is None:
+        font_dir = os.path.join(settings.BASE_DIR, 'main', 'static', 'fonts')
+        for (bold, italic), file_name in PDF_FONTS.items():
+            font_name = os.path.splitext(file_name)[0]
+            pdfmetrics.registerFont(TTFont(font_name, os.path.join(font_dir, file_name)))
+            addMapping('DejaVuSans', bold, italic, font_name)
+        # Makes "font-family: 'DejaVu Sans'" in the template resolve to the registered font.
+        default.DEFAULT_FONT[PDF_FONT_FAMILY.lower()] = 'DejaVuSans'
+        _template = get_template(PDF_TEMPLATE)
+    return _template
+
+
+def application_pdf_html(application) -> str:
+    return prepare_renderer().render({'application': application})
+
+
+def content_hash(html: str) -> str:
+    """
+    Hash of the rendered HTML: the same HTML always gives the same PDF.
+    """
+    return sha256(html.encode('UTF-8')).hexdigest()
+
+
+def render_pdf(html: str) -> bytes:
+    """
+    Converts rendered HTML to PDF bytes. Raises ValueError if xhtml2pdf reports errors.
+    """
+    prepare_renderer()
+    buffer = BytesIO()
+    pdf = pisa.pisaDocument(BytesIO(html.encode('UTF-8')), buffer)
+    if pdf.err:
+        raise ValueError(f'Could not render the PDF ({pdf.err} errors).')
+    return buffer.getvalue()
+
+
+def application_pdf_name(application) -> str:
+    """
+    Storage name of the application PDF, relative to MEDIA_ROOT. It only depends on the
+    application, so re-rendering overwrites the same file.
+    """
+    created_str = timezone.localtime(application.created_at).strftime('%Y-%m-%d')
+    return os.path.join('applications', str(application.student_id), created_str, str(application.id),
+                        f'application_{application.id}.pdf')
+
+
+def write_application_pdf(application, force: bool = False) -> Dict[str, Any]:
+    """
+    Renders the application PDF into MEDIA_ROOT unless the stored PDF was made from the same HTML
+    (or "force" is set). Returns {"name", "hash", "rendered", "seconds"}. The Application row itself is not saved.
+    """
+    started = perf_counter()
+    html = application_pdf_html(application)
+    pdf_hash = content_hash(html)
+    name = application_pdf_name(application)
+    path = os.path.join(settings.MEDIA_ROOT, name)
+
+    if not force and pdf_hash == application.pdf_hash and os.path.exists(path):
+        return {'name': name, 'hash': pdf_hash, 'rendered': False, 'seconds': perf_counter() - started}
+
+    content = render_pdf(html)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Written to a temporary file of its own first, so a reader never gets a half-written PDF and
+    # concurrent writers (a download racing the job queue) never share one.
+    with NamedTemporaryFile(dir=os.path.dirname(path), suffix='.tmp', delete=False) as pdf_file:
+        pdf_file.write(content)
+    try:
+        os.replace(pdf_file.name, path)
+    except OSError:
+        os.unlink(pdf_file.name)
+        raise
+    return {'name': name, 'hash': pdf_hash, 'rendered': True, 'seconds': perf_counter() - started}
+
+
+def ensure_application_pdf(application) -> Dict[str, Any]:
+    """
+    Returns the PDF of an application (see "write_application_pdf"), rendering it first if it is
+    missing or out of date. Used by downloads, so PDFs can be rendered on first request.
+    """
+    result = write_application_pdf(application)
+    if result['rendered'] or application.pdf_file.name != result['name'] or application.pdf_status != 'ready':
+        Application = apps.get_model('main', 'Application')
+        Application.objects.filter(pk=application.pk).update(
+            pdf_file=result['name'], pdf_hash=result['hash'], pdf_status='ready')
+        application.pdf_file.name = result['name']
+        application.pdf_hash = result['hash']
+        application.pdf_status = 'ready'
+    return result
+
+
+def init_render_worker() -> None:
+    """
+    Initializer of the render worker processes. They are spawned rather than forked, so they
+    never share the parent's database connections, and have to set Django up first.
+    The workers live as long as the pool, so the template and fonts are loaded here once.
+    """
+    if not apps.ready:
+        django.setup()
+    prepare_renderer()
+
+
+def render_application(application_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Runs in a render worker: writes the PDF of an application (see "write_application_pdf"),
+    or returns None if the application was deleted meanwhile.
+    """
+    Application = apps.get_model('main', 'Application')
+    application = Application.objects.select_related('student', 'responsible', 'executor').filter(
+        pk=application_id).first()
+    if application is None:
+        return None
+    return write_application_pdf(application)
+
+
+def render_applications(application_ids: List[int], force: bool = False) -> List[Dict[str, Any]]:
+    """
+    Runs in a render worker: writes the PDFs of a batch of applications read with one query.
+    Returns one result per application, with its "id" and either the "write_application_pdf"
+    fields or an "error".
+    """
+    Application = apps.get_model('main', 'Application')
+    results = []
+    for application in Application.objects.select_related('student', 'responsible', 'executor').filter(
+            pk__in=application_ids):
+        try:
+            results.append({'id': application.id, **write_application_pdf(application, force=force)})
+        except Exception as e:
+            results.append({'id': application.id, 'error': str(e)})
+    return results
+
+
+def claim_jobs(limit: int) -> Dict[int, List[int]]:
+    """
+    Marks the pending jobs of up to "limit" applications as running and returns
+    {application id: claimed job ids}. Several pending jobs of one application are claimed
+    together, so it is rendered once.
+    """
+    PdfRenderJob = apps.get_model('main', 'PdfRenderJob')
+    application_ids: List[int] = []
+    for application_id in (PdfRenderJob.objects.filter(status='pending').order_by('id')
+                           .values_list('application_id', flat=True).iterator()):
+        if application_id not in application_ids:
+            application_ids.append(application_id)
+            if len(application_ids) == limit:
+                break
+
+    claimed = {}
+    for application_id in application_ids:
+        started_at = timezone.now()
+        # The status filter makes the claim atomic: a job taken by another worker meanwhile is skipped.
+        pending = PdfRenderJob.objects.filter(application_id=application_id, status='pending')
+        if pending.update(status='running', started_at=started_at):
+            claimed[application_id] = list(PdfRenderJob.objects.filter(
+                application_id=application_id, status='running', started_at=started_at,
+            ).values_list('id', flat=True))
+    return claimed
+
+
+def finish_jobs(application_id: int, job_ids: List[int], result: Optional[Dict[str, Any]]) -> None:
+    Application = apps.get_model('main', 'Application')
+    PdfRenderJob = apps.get_model('main', 'PdfRenderJob')
+
+    if result is not None:
+        Application.objects.filter(pk=application_id).update(
+            pdf_file=result['name'], pdf_hash=result['hash'], pdf_status='ready')
+    PdfRenderJob.objects.filter(id__in=job_ids).update(
+        status='done', attempts=F('attempts') + 1, error='', finished_at=timezone.now())
+
+
+def fail_jobs(application_id: int, job_ids: List[int], error: str, max_attempts: int) -> bool:
+    """
+    Puts the jobs back in the queue, or marks them (and the application PDF) as failed once
+    they ran out of attempts. Returns True if they failed for good.
+    """
+    Application = apps.get_model('main', 'Application')
+    PdfRenderJob = apps.get_model('main', 'PdfRenderJob')
+
+    jobs = PdfRenderJob.objects.filter(id__in=job_ids)
+    jobs.filter(attempts__lt=max_attempts - 1).update(
+        status='pending', attempts=F('attempts') + 1, error=error, started_at=None)
+    failed = jobs.filter(status='running').update(
+        status='failed', attempts=F('attempts') + 1, error=error, finished_at=timezone.now())
+    if failed:
+        Application.objects.filter(pk=application_id).update(pdf_status='failed')
+    return bool(failed)
+
+
+def requeue_stale_jobs(timeout: float) -> int:
+    """
+    Jobs left running for longer than "timeout" seconds belong to a worker that died: run them again.
+    """
+    PdfRenderJob = apps.get_model('main', 'PdfRenderJob')
+    return PdfRenderJob.objects.filter(
+        status='running', started_at__lt=timezone.now() - timedelta(seconds=timeout),
+    ).update(status='pending', started_at=None)
+
+
+ARCHIVE_MANIFEST_FIELDS = ['id', 'created_at', 'student', 'title', 'category', 'status', 'file', 'pdf_status', 'error']
+
+
+class CsvLine:
+    """
+    File object for csv.writer that hands every written line back instead of storing it.
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def archived_pdf(application) -> Optional[str]:
+    """
+    Path of the application PDF, if one was ever rendered and is still on disk. A PDF waiting
+    to be rendered again ("stale", "pending") is archived as it is, the manifest says so.
+    """
+    if not application.pdf_file.name:
+        return None
+    path = os.path.join(settings.MEDIA_ROOT, application.pdf_file.name)
+    return path if os.path.exists(path) else None
+
+
+def archive_pdf_name(application) -> str:
+    return f'{timezone.localtime(application.created_at):%Y-%m}/application_{application.id}.pdf'
+
+
+def archive_manifest(applications) -> Iterator[bytes]:
+    """
+    CSV manifest of the archive, one line per application, with the PDF status (a "stale" PDF
+    predates the last edit). Applications whose PDF is not there are listed with an error instead of a file.
+    """
+    writer = csv.DictWriter(CsvLine(), fieldnames=ARCHIVE_MANIFEST_FIELDS)
+    # utf-8-sig, so that Excel opens the Cyrillic titles correctly.
+    yield writer.writeheader().encode('utf-8-sig')
+    for application in applications.iterator(chunk_size=200):
+        has_pdf = archived_pdf(application) is not None
+        yield writer.writerow({
+            'id': application.id,
+            'created_at': timezone.localtime(application.created_at).isoformat(),
+            'student': application.student.get_username(),
+            'title': application.title,
+            'category': application.category or '',
+            'status': application.status,
+            'file': archive_pdf_name(application) if has_pdf else '',
+            'pdf_status': application.pdf_status,
+            'error': '' if has_pdf else 'PDF is missing.',
+        }).encode('utf-8')
+
+
+def application_archive_entries(queryset) -> Iterator[Tuple[str, Union[str, Iterator[bytes]]]]:
+    """
+    Entries for "stream_zip": the stored PDF of every application and a CSV manifest at the end.
+    Nothing is rendered here: stored PDFs are archived even if out of date, and applications
+    without a PDF are only listed in the manifest.
+    Applications are read from the database in chunks, once for the PDFs and once for the manifest.
+    """
+    for application in queryset.only('id', 'created_at', 'pdf_file', 'pdf_status').iterator(chunk_size=200):
+        path = archived_pdf(application)
+        if path is not None:
+            yield archive_pdf_name(application), path
+
+    yield 'manifest.csv', archive_manifest(queryset.select_related('student', 'category'))
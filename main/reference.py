@@ -0,0 +1,103 @@
+from hashlib import sha256
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import (Category, DayOfWeek, Executor, Faculty, Language, Responsible, Speciality, StudentStatus,
+                     Subject, TypeOfGrades)
+from .serializers import (CategorySerializer, DayOfWeekSerializer, ExecutorSerializer, FacultySerializer,
+                          LanguageSerializer, ResponsibleSerializer, SpecialitySerializer, StudentStatusSerializer,
+                          SubjectSerializer, TypeOfGradesSerializer)
+
+
+# Reference tables that change a few times a year: router prefix -> (model, serializer).
+REFERENCE_DATA = {
+    'faculties': (Faculty, FacultySerializer),
+    'specialities': (Speciality, SpecialitySerializer),
+    'subjects': (Subject, SubjectSerializer),
+    'languages': (Language, LanguageSerializer),
+    'student-statuses': (StudentStatus, StudentStatusSerializer),
+    'day-of-weeks': (DayOfWeek, DayOfWeekSerializer),
+    'category': (Category, CategorySerializer),
+    'executor': (Executor, ExecutorSerializer),
+    'responsible': (Responsible, ResponsibleSerializer),
+    'type-of-grades': (TypeOfGrades, TypeOfGradesSerializer),
+}
+REFERENCE_MODELS = [model for model, _ in REFERENCE_DATA.values()]
+
+VERSION_KEY = 'reference_version'
+
+
+def reference_version() -> str:
+    """
+    Changes whenever a reference row is saved or deleted (see signals.py). Cached responses and
+    ETags include it, so a bump makes all of them stale at once.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # add() keeps the version another process may have set meanwhile.
+        cache.add(VERSION_KEY, uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_reference_version() -> None:
+    cache.set(VERSION_KEY, uuid4().hex, None)
+
+
+def cached_reference_response(request, build) -> Response:
+    """
+    Answers a GET from the cache: 304 if If-None-Match has the current ETag, the cached data
+    otherwise. Neither touches the database; only a miss calls build() for a fresh Response.
+    The ETag covers the data version, the URL with its query string and the format.
+
+    Example usage:
+    cached_reference_response(request, lambda: Response(FacultySerializer(faculties, many=True).data))
+    """
+    version = reference_version()
+    renderer = getattr(request, 'accepted_renderer', None)
+    variant = sha256(f'{request.build_absolute_uri()}|{getattr(renderer, "format", "")}'.encode()).hexdigest()[:32]
+    etag = f'"{version}-{variant}"'
+
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        key = f'reference:{version}:{variant}'
+        data = cache.get(key)
+        if data is None:
+            response = build()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cache.set(key, response.data, getattr(settings, 'REFERENCE_CACHE_SECONDS', 24 * 60 * 60))
+        else:
+            response = Response(data)
+    response['ETag'] = etag
+    # Clients may keep the data, but must ask (cheaply, with If-None-Match) whether it changed.
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+class ReferenceCacheMixin:
+    """
+    For the viewsets of REFERENCE_DATA: list and retrieve go through cached_reference_response.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return cached_reference_response(
+            request, lambda: super(ReferenceCacheMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_reference_response(
+            request, lambda: super(ReferenceCacheMixin, self).retrieve(request, *args, **kwargs))
+
+
+def reference_bundle() -> dict:
+    # No request in the serializer context: the bundle always has every field.
+    return {
+        name: serializer_class(model.objects.order_by('pk'), many=True).data
+        for name, (model, serializer_class) in REFERENCE_DATA.items()
+    }
@@ -0,0 +1,172 @@
+import logging
+from dataclasses import dataclass
+from functools import cached_property
+from os import stat
+from os.path import abspath
+from sys import getsizeof
+from threading import Event, Lock, Thread
+from typing import Any, Dict, List, Optional, Tuple
+
+from .schedule_index import TimetableIndex
+from .schedule_query import ScheduleIntervals
+from .scraper import load_workbook_schedules
+
+
+logger = logging.getLogger(__name__)
+
+
+def workbook_stamp(file: str) -> Tuple[int, int]:
+    """
+    Returns the (mtime, size) pair used to tell whether a workbook changed on disk.
+    """
+    try:
+        file_stat = stat(file)
+    except FileNotFoundError as e:
+        raise FileNotFoundError(f'File "{file}" not found.') from e
+
+    return file_stat.st_mtime_ns, file_stat.st_size
+
+
+def estimate_size(schedules: Dict[str, List[Dict[str, Any]]]) -> int:
+    """
+    Rough number of bytes a parsed workbook takes in memory: the records, their values and
+    the index slots, which copy every record once.
+    """
+    size = 0
+    for schedule in schedules.values():
+        size += getsizeof(schedule)
+        for entry in schedule:
+            size += 2 * getsizeof(entry) + sum(getsizeof(value) for value in entry.values())
+    return size
+
+
+@dataclass(frozen=True)
+class TimetableSnapshot:
+    """
+    Every sheet of one workbook version, parsed, together with its TimetableIndex.
+    Snapshots are never modified, a newer workbook gets a new snapshot.
+    """
+
+    file: str
+    stamp: Tuple[int, int]
+    schedules: Dict[str, List[Dict[str, Any]]]
+    index: TimetableIndex
+    size: int = 0
+
+    @classmethod
+    def load(cls, file: str) -> 'TimetableSnapshot':
+        # The stamp is taken before parsing: if the file changes meanwhile, the next check reloads it.
+        stamp = workbook_stamp(file)
+        schedules = load_workbook_schedules(file)
+        return cls(file=file, stamp=stamp, schedules=schedules,
+                   index=TimetableIndex.build(file, schedules, stamp), size=estimate_size(schedules))
+
+    @cached_property
+    def intervals(self) -> ScheduleIntervals:
+        """
+        Free-room and clash structures over the slots, built on first use. They live on the
+        snapshot, so evicting or replacing the snapshot frees them too.
+        """
+        return ScheduleIntervals(self.index.slots)
+
+    def sheet(self, sheet_name: str) -> List[Dict[str, Any]]:
+        """
+        Returns the schedule of a sheet. Sheet names are also matched without the stray
+        trailing spaces some sheets have ("МОиЭ2кРО ").
+        """
+        if sheet_name in self.schedules:
+            return self.schedules[sheet_name]
+        for name, schedule in self.schedules.items():
+            if name.strip() == sheet_name.strip():
+                return schedule
+        raise ValueError(f'Sheet name "{sheet_name}" not found.')
+
+
+class TimetableWatcher:
+    """
+    Keeps a ready TimetableSnapshot of one workbook.
+
+    Once started, a background thread checks the loaded workbook every "interval" seconds and,
+    when it changed, parses it off the request path and swaps the new snapshot in. A workbook
+    that was never loaded (or was evicted with "clear") is left alone until it is used again.
+    Requests always get the current snapshot without waiting. Without the thread (management
+    commands, tests) the workbook is checked on every call instead. Concurrent callers that find
+    no usable snapshot wait for a single parse instead of each parsing the workbook.
+
+    Example usage:
+    TimetableWatcher("timetable.xlsx").snapshot().sheet("ИС 1ао")
+    """
+
+    def __init__(self, file: str, interval: float = 5):
+        self.file = abspath(file)
+        self.interval = interval
+        self.hits = 0
+        self.loads = 0
+        self.errors = 0
+        self._snapshot: Optional[TimetableSnapshot] = None
+        self._load_lock = Lock()
+        self._stopped = Event()
+        self._thread: Optional[Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def snapshot(self) -> TimetableSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and (self.running or snapshot.stamp == workbook_stamp(self.file)):
+            self.hits += 1
+            return snapshot
+        return self.refresh()
+
+    def refresh(self) -> TimetableSnapshot:
+        """
+        Parses the workbook if it changed since the current snapshot and swaps the new snapshot in.
+        """
+        with self._load_lock:
+            # Whoever held the lock before us may have loaded the same version already.
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.stamp == workbook_stamp(self.file):
+                return snapshot
+
+            snapshot = TimetableSnapshot.load(self.file)
+            self._snapshot = snapshot
+            self.loads += 1
+            return snapshot
+
+    def clear(self) -> None:
+        self._snapshot = None
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopped.clear()
+        self._thread = Thread(target=self._watch, name=f'timetable-watcher:{self.file}', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _watch(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                if self._snapshot is not None:
+                    self.refresh()
+            except Exception:
+                # A half-uploaded workbook fails to parse; the old snapshot stays until the next try.
+                self.errors += 1
+                logger.exception('Could not load the timetable "%s".', self.file)
+            self._stopped.wait(self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            'file': self.file,
+            'running': self.running,
+            'loaded': snapshot is not None,
+            'sheets': len(snapshot.schedules) if snapshot else 0,
+            'size': snapshot.size if snapshot else 0,
+            'hits': self.hits,
+            'loads': self.loads,
+            'errors': self.errors,
+        }
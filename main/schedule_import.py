@@ -0,0 +1,300 @@
+from dataclasses import dataclass, field
+from datetime import time
+from hashlib import sha256
+from json import dumps
+from re import IGNORECASE, compile, findall, split
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .constants import DEFAULT_LANGUAGE, LANGUAGE_DEPARTMENT_MAP, WEEKDAYS
+from .models import (DayOfWeek, Language, Schedule, ScheduleSheet, ScheduleVersion, Speciality,
+                     Subject, Teacher)
+from .reference import bump_reference_version
+from .scraper import load_workbook_schedules
+
+
+TIME_RANGE_PATTERN = compile(r'^\s*(\d{1,2})\.(\d{2})\s*-\s*(\d{1,2})\.(\d{2})')
+DEPARTMENT_PATTERN = compile(r'(ро|ко|ао)\b', IGNORECASE)
+
+
+def parse_time_range(value: str) -> Tuple[time, time]:
+    """
+    Parses a timetable cell like "8.00-8.50" into (time_start, time_end).
+    """
+    match = TIME_RANGE_PATTERN.match(value or '')
+    if not match:
+        raise ValueError(f'Time range "{value}" is not in the "8.00-8.50" format.')
+
+    start_hour, start_minute, end_hour, end_minute = map(int, match.groups())
+    return time(start_hour, start_minute), time(end_hour, end_minute)
+
+
+def format_time_range(time_start: time, time_end: time) -> str:
+    return f'{time_start.hour}.{time_start.minute:02d}-{time_end.hour}.{time_end.minute:02d}'
+
+
+def split_teachers(value: Optional[str]) -> List[str]:
+    """
+    Splits a "Teacher" cell into separate names: "Карабаев А.С., Корабаева Е.А." -> two names.
+    """
+    if not value or value == 'None':
+        return []
+    return [name.strip() for name in split(r'[,;\n]+', value) if name.strip()]
+
+
+def split_teacher_name(name: str) -> Tuple[str, str, str]:
+    """
+    Splits "Шамшидинова Ф.М." into (last_name, first_name, middle_name) = ("Шамшидинова", "Ф.", "М.").
+    """
+    last_name, _, rest = name.partition(' ')
+    initials = findall(r'[^\W\d_]+\.?', rest) + ['', '']
+    return last_name[:50], initials[0][:50], ' '.join(initials[1:]).strip()[:50]
+
+
+def teacher_key(last_name: str, first_name: str, middle_name: str) -> Tuple[str, str, str]:
+    """
+    Teachers are matched by last name and initials, so "Шамшидинова Ф.М." from the timetable
+    finds a teacher entered in the admin as "Шамшидинова Фарида Маратовна".
+    """
+    return last_name.lower(), first_name[:1].lower(), middle_name[:1].lower()
+
+
+def sheet_speciality_name(sheet_name: str) -> str:
+    return sheet_name.strip()
+
+
+def sheet_language_name(sheet_name: str) -> str:
+    match = DEPARTMENT_PATTERN.search(sheet_name)
+    return LANGUAGE_DEPARTMENT_MAP[match.group(1).lower()] if match else DEFAULT_LANGUAGE
+
+
+class LookupCache:
+    """
+    Name -> id lookups for the reference tables the timetable points at. Every table is read
+    once per import and the missing names are inserted with a single bulk_create.
+    "created_reference" tells whether any row of the cached reference tables was added.
+    """
+
+    def __init__(self) -> None:
+        self.created_reference = False
+        self.days = {day.name_en: day.id for day in DayOfWeek.objects.all()}
+        self.subjects = dict(Subject.objects.values_list('name', 'id'))
+        self.specialities = dict(Speciality.objects.values_list('name', 'id'))
+        self.languages = dict(Language.objects.values_list('name', 'id'))
+        self.teachers = {
+            teacher_key(last_name, first_name, middle_name): teacher_id
+            for teacher_id, last_name, first_name, middle_name
+            in Teacher.objects.values_list('id', 'last_name', 'first_name', 'middle_name')
+        }
+
+    def _create_missing(self, lookup: Dict[str, int], model, names: Iterable[str]) -> None:
+        missing = sorted({name for name in names if name not in lookup})
+        for obj in model.objects.bulk_create([model(name=name) for name in missing]):
+            lookup[obj.name] = obj.id
+        self.created_reference |= bool(missing)
+
+    def prepare(self, schedules: Dict[str, List[Dict[str, Any]]]) -> None:
+        records = [entry for schedule in schedules.values() for entry in schedule]
+
+        missing_days = [name for name in WEEKDAYS if name not in self.days]
+        for day in DayOfWeek.objects.bulk_create([DayOfWeek(name_en=name) for name in missing_days]):
+            self.days[day.name_en] = day.id
+        self.created_reference |= bool(missing_days)
+
+        self._create_missing(self.subjects, Subject, (entry['Subject'] for entry in records if entry['Subject']))
+        self._create_missing(self.specialities, Speciality, map(sheet_speciality_name, schedules))
+        self._create_missing(self.languages, Language, map(sheet_language_name, schedules))
+
+        new_teachers = {}
+        for entry in records:
+            for name in split_teachers(entry['Teacher']):
+                last_name, first_name, middle_name = split_teacher_name(name)
+                key = teacher_key(last_name, first_name, middle_name)
+                if key not in self.teachers and key not in new_teachers:
+                    new_teachers[key] = Teacher(
+                        last_name=last_name, first_name=first_name, middle_name=middle_name)
+        for key, teacher in zip(new_teachers, Teacher.objects.bulk_create(new_teachers.values())):
+            self.teachers[key] = teacher.id
+
+    def teacher_id(self, value: Optional[str]) -> Optional[int]:
+        names = split_teachers(value)
+        return self.teachers[teacher_key(*split_teacher_name(names[0]))] if names else None
+
+
+ROW_FIELDS = ('day_of_week_id', 'time_start', 'time_end', 'subject_id', 'teacher_id',
+              'teacher_display', 'room', 'language_id')
+
+
+def sheet_fingerprint(schedule: List[Dict[str, Any]]) -> str:
+    """
+    Content hash of a parsed sheet. Identical sheets give identical fingerprints.
+    """
+    return sha256(dumps(schedule, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def row_key(row: Schedule) -> Tuple[Any, ...]:
+    return tuple(getattr(row, name) for name in ROW_FIELDS)
+
+
+@dataclass
+class ScheduleImport:
+    """
+    Imports a timetable workbook into Schedule rows under a new ScheduleVersion.
+
+    The Schedule table always holds exactly one (the current) timetable per speciality and source
+    (the TIMETABLE_SOURCES key of the workbook: semester, campus). Every sheet's content
+    fingerprint is stored in ScheduleSheet: sheets that did not change since the last import
+    are skipped, and changed sheets only get the rows that were added or removed.
+    What changed is stored in ScheduleVersion.summary.
+
+    Example usage:
+    ScheduleImport(file="timetable.xlsx", source="default").run()
+    """
+
+    file: str
+    source: str
+    sheet_names: Optional[List[str]] = None
+    version_number: Optional[str] = None
+    chunk_size: int = 500
+    max_workers: int = 1
+    force: bool = False
+    skipped: List[str] = field(default_factory=list, init=False)
+
+    def build_rows(self, version: ScheduleVersion, lookups: LookupCache,
+                   sheet_name: str, schedule: List[Dict[str, Any]]) -> List[Schedule]:
+        speciality_id = lookups.specialities[sheet_speciality_name(sheet_name)]
+        language_id = lookups.languages[sheet_language_name(sheet_name)]
+        rows = []
+
+        for entry in schedule:
+            if not entry['Subject'] or entry['Day'] not in lookups.days:
+                self.skipped.append(f'{sheet_name}: {entry}')
+                continue
+            try:
+                time_start, time_end = parse_time_range(entry['Time'])
+            except ValueError:
+                self.skipped.append(f'{sheet_name}: {entry}')
+                continue
+
+            rows.append(Schedule(
+                day_of_week_id=lookups.days[entry['Day']],
+                time_start=time_start,
+                time_end=time_end,
+                subject_id=lookups.subjects[entry['Subject']],
+                teacher_id=lookups.teacher_id(entry['Teacher']),
+                teacher_display=(entry['Teacher'] or '')[:255],
+                room=(entry['Room'] or '')[:255],
+                speciality_id=speciality_id,
+                language_id=language_id,
+                version=version,
+                source=self.source,
+            ))
+
+        return rows
+
+    def diff_rows(self, speciality_id: int, rows: List[Schedule]) -> Tuple[List[Schedule], List[int]]:
+        """
+        Compares the new rows of a speciality with the ones stored for the same source and returns
+        (rows to insert, ids to delete). Rows present in both are left untouched.
+        """
+        existing: Dict[Tuple[Any, ...], List[int]] = {}
+        stored_rows = Schedule.objects.filter(source=self.source, speciality_id=speciality_id).only('id', *ROW_FIELDS)
+        for stored in stored_rows:
+            existing.setdefault(row_key(stored), []).append(stored.id)
+
+        to_insert = []
+        for row in rows:
+            ids = existing.get(row_key(row))
+            if ids:
+                ids.pop()
+            else:
+                to_insert.append(row)
+
+        return to_insert, [row_id for ids in existing.values() for row_id in ids]
+
+    def run(self) -> Optional[ScheduleVersion]:
+        """
+        Returns the new ScheduleVersion, or None if no sheet changed.
+        """
+        # Parsing happens before the transaction so the database is not locked meanwhile.
+        schedules = load_workbook_schedules(
+            self.file, sheet_names=self.sheet_names, max_workers=self.max_workers)
+        fingerprints = {name: sheet_fingerprint(schedule) for name, schedule in schedules.items()}
+
+        with transaction.atomic():
+            stored = dict(
+                ScheduleSheet.objects
+                .filter(source=self.source, sheet_name__in=list(schedules))
+                .values_list('sheet_name', 'fingerprint')
+            )
+            changed = {
+                name: schedule for name, schedule in schedules.items()
+                if self.force or stored.get(name) != fingerprints[name]
+            }
+            if not changed:
+                return None
+
+            version = ScheduleVersion.objects.create(
+                version_number=self.version_number or timezone.now().strftime('%Y-%m-%d %H:%M:%S'),
+                source=self.source)
+            lookups = LookupCache()
+            lookups.prepare(changed)
+            if lookups.created_reference:
+                # bulk_create sends no post_save, so the cached reference data is invalidated here.
+                transaction.on_commit(bump_reference_version)
+
+            summary = {'sheets': {}, 'unchanged': sorted(set(schedules) - set(changed))}
+            to_insert, to_delete = [], []
+            for sheet_name, schedule in changed.items():
+                speciality_id = lookups.specialities[sheet_speciality_name(sheet_name)]
+                inserted, deleted = self.diff_rows(
+                    speciality_id, self.build_rows(version, lookups, sheet_name, schedule))
+                to_insert += inserted
+                to_delete += deleted
+                summary['sheets'][sheet_name] = {'inserted': len(inserted), 'deleted': len(deleted)}
+
+                ScheduleSheet.objects.update_or_create(
+                    source=self.source, sheet_name=sheet_name,
+                    defaults={'speciality_id': speciality_id,
+                              'fingerprint': fingerprints[sheet_name],
+                              'version': version},
+                )
+
+            for start in range(0, len(to_delete), self.chunk_size):
+                Schedule.objects.filter(id__in=to_delete[start:start + self.chunk_size]).delete()
+            Schedule.objects.bulk_create(to_insert, batch_size=self.chunk_size)
+
+            summary['inserted'] = len(to_insert)
+            summary['deleted'] = len(to_delete)
+            version.summary = summary
+            version.save(update_fields=['summary'])
+
+        return version
+
+
+def stored_schedule(source: str, sheet_name: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Returns the timetable of a speciality imported from the "source" workbook, in the same format
+    as ScheduleScraper, or None if that sheet has never been imported.
+    """
+    rows = (
+        Schedule.objects
+        .filter(source=source, speciality__name=sheet_speciality_name(sheet_name))
+        .select_related('day_of_week', 'subject')
+        .order_by('day_of_week_id', 'time_start', 'id')
+    )
+
+    schedule = [
+        {
+            'Day': row.day_of_week.name_en,
+            'Time': format_time_range(row.time_start, row.time_end),
+            'Subject': row.subject.name,
+            'Teacher': row.teacher_display or None,
+            'Room': row.room or None,
+        }
+        for row in rows
+    ]
+
+    return schedule or None
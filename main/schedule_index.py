@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+from re import split
+from typing import Any, Dict, List, Optional, Tuple
+
+from .schedule_import import split_teachers
+
+
+def normalize_key(value: str) -> str:
+    """
+    Index keys ignore case and extra whitespace: "Шамшидинова  ф.м." finds "Шамшидинова Ф.М.".
+    """
+    return ' '.join(value.split()).casefold()
+
+
+def split_rooms(value: Optional[str]) -> List[str]:
+    """
+    Splits a "Room" cell into separate rooms: "а402,\n309" -> ["а402", "309"].
+    """
+    if not value or value == 'None':
+        return []
+    return [room.strip() for room in split(r'[,;\n]+', value) if room.strip()]
+
+
+@dataclass(frozen=True)
+class TimetableIndex:
+    """
+    Inverted index over every sheet of one workbook version: teacher, room and subject -> slots.
+    A slot is a schedule record with the sheet it comes from in "Sheet".
+    """
+
+    file: str
+    stamp: Tuple[int, int]
+    slots: List[Dict[str, Any]]
+    teachers: Dict[str, List[Dict[str, Any]]]
+    rooms: Dict[str, List[Dict[str, Any]]]
+    subjects: Dict[str, List[Dict[str, Any]]]
+
+    @classmethod
+    def build(cls, file: str, schedules: Dict[str, List[Dict[str, Any]]],
+              stamp: Tuple[int, int]) -> 'TimetableIndex':
+        teachers: Dict[str, List[Dict[str, Any]]] = {}
+        rooms: Dict[str, List[Dict[str, Any]]] = {}
+        subjects: Dict[str, List[Dict[str, Any]]] = {}
+        slots = []
+
+        for sheet_name, schedule in schedules.items():
+            for entry in schedule:
+                slot = {'Sheet': sheet_name, **entry}
+                slots.append(slot)
+                for teacher in split_teachers(entry['Teacher']):
+                    teachers.setdefault(normalize_key(teacher), []).append(slot)
+                for room in split_rooms(entry['Room']):
+                    rooms.setdefault(normalize_key(room), []).append(slot)
+                if entry['Subject'] and entry['Subject'] != 'None':
+                    subjects.setdefault(normalize_key(entry['Subject']), []).append(slot)
+
+        return cls(file=file, stamp=stamp, slots=slots, teachers=teachers, rooms=rooms, subjects=subjects)
+
+    def teacher(self, name: str) -> List[Dict[str, Any]]:
+        return self.teachers.get(normalize_key(name), [])
+
+    def room(self, room: str) -> List[Dict[str, Any]]:
+        return self.rooms.get(normalize_key(room), [])
+
+    def subject(self, name: str) -> List[Dict[str, Any]]:
+        return self.subjects.get(normalize_key(name), [])
+
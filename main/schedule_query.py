@@ -0,0 +1,197 @@
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from heapq import heappop, heappush
+from itertools import accumulate
+from re import compile
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .models import Schedule
+from .schedule_import import format_time_range, parse_time_range, split_teachers
+from .schedule_index import normalize_key, split_rooms
+from .scraper import DAY_ALIASES, DAY_NAMES
+
+
+CLOCK_TIME_PATTERN = compile(r'^\s*(\d{1,2})(?:[.:](\d{2}))?\s*$')
+# Lowercased English day names and every spelling of them in the workbooks -> English day name.
+DAY_LOOKUP = {**{alias.lower(): day for alias, day in DAY_ALIASES.items()},
+              **{day.lower(): day for day in DAY_NAMES}}
+
+
+def to_minutes(value: str) -> int:
+    """
+    Converts "11.10" (or "11:10", or "11" for 11.00) to minutes since midnight.
+    Raises ValueError for anything else.
+    """
+    match = CLOCK_TIME_PATTERN.match(value)
+    hours, minutes = (int(group or 0) for group in match.groups()) if match else (24, 0)
+    if hours > 23 or minutes > 59:
+        raise ValueError(f'Time "{value}" is not in the "11.10" format.')
+    return hours * 60 + minutes
+
+
+def parse_day(value: str) -> str:
+    """
+    Returns the English name of a day given in any spelling the workbooks use ("Вторник", "tuesday").
+    """
+    day = DAY_LOOKUP.get(value.strip().lower())
+    if day is None:
+        raise ValueError(f'Unknown day "{value}". Expected one of: {", ".join(DAY_NAMES)}.')
+    return day
+
+
+def is_physical_room(room: str) -> bool:
+    """
+    Online lessons ("https://online...") and placements ("на предприятии") can't clash.
+    """
+    return not room.startswith('http') and any(character.isdigit() for character in room)
+
+
+@dataclass
+class DayIntervals:
+    """
+    Slots of one room or teacher on one day, sorted by start time. "max_ends[i]" is the latest
+    end among the first i + 1 slots, so an overlap check is a single binary search.
+    """
+
+    starts: List[int] = field(default_factory=list)
+    ends: List[int] = field(default_factory=list)
+    slots: List[Dict[str, Any]] = field(default_factory=list)
+    max_ends: List[int] = field(default_factory=list)
+
+    @classmethod
+    def build(cls, items: List[Tuple[int, int, Dict[str, Any]]]) -> 'DayIntervals':
+        items.sort(key=lambda item: (item[0], item[1]))
+        ends = [end for _, end, _ in items]
+        return cls(
+            starts=[start for start, _, _ in items],
+            ends=ends,
+            slots=[slot for _, _, slot in items],
+            max_ends=list(accumulate(ends, max)),
+        )
+
+    def is_busy(self, start: int, end: int) -> bool:
+        # Only the slots starting before "end" can overlap [start, end).
+        count = bisect_left(self.starts, end)
+        return count > 0 and self.max_ends[count - 1] > start
+
+    def clashes(self) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Sweeps the slots in start order keeping the ones still running in a heap, and returns
+        every overlapping pair.
+        """
+        pairs = []
+        running: List[Tuple[int, int]] = []
+
+        for position, (start, end) in enumerate(zip(self.starts, self.ends)):
+            while running and running[0][0] <= start:
+                heappop(running)
+            pairs.extend((self.slots[other], self.slots[position]) for _, other in running)
+            heappush(running, (end, position))
+
+        return pairs
+
+
+def slot_key(slot: Dict[str, Any]) -> Tuple[Any, ...]:
+    """
+    Slots with the same time, teachers and rooms are one lesson given to several groups (a stream),
+    even if the subject is spelled slightly differently on each sheet.
+    """
+    return (slot['Day'], slot['Time'], normalize_key(slot['Teacher'] or ''),
+            normalize_key(slot['Room'] or ''))
+
+
+class ScheduleIntervals:
+    """
+    Per-day interval structures per room and per teacher over timetable slots.
+
+    A slot is a schedule record (Day, Time, Subject, Teacher, Room) with the sheet it comes from
+    in "Sheet". The same lesson taught to several groups at once appears on several sheets; it is
+    counted once, with every group listed in "Sheets" (see "slot_key").
+
+    Example usage:
+    intervals = ScheduleIntervals(slots)
+    intervals.free_rooms("Tuesday", "11.10", "12.00")
+    intervals.clashes("teacher")
+    """
+
+    def __init__(self, slots: Iterable[Dict[str, Any]]):
+        lessons: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        for slot in slots:
+            lesson = lessons.setdefault(slot_key(slot), {**slot, 'Sheets': []})
+            lesson['Sheets'].append(slot.get('Sheet'))
+
+        rooms: Dict[Tuple[str, str], List[Tuple[int, int, Dict[str, Any]]]] = {}
+        teachers: Dict[Tuple[str, str], List[Tuple[int, int, Dict[str, Any]]]] = {}
+        self.names: Dict[str, Dict[str, str]] = {'room': {}, 'teacher': {}}
+
+        for lesson in lessons.values():
+            try:
+                time_start, time_end = parse_time_range(lesson['Time'])
+            except ValueError:
+                continue
+            item = (time_start.hour * 60 + time_start.minute, time_end.hour * 60 + time_end.minute, lesson)
+
+            for room in split_rooms(lesson['Room']):
+                if is_physical_room(room):
+                    self.names['room'].setdefault(normalize_key(room), room)
+                    rooms.setdefault((lesson['Day'], normalize_key(room)), []).append(item)
+            for teacher in split_teachers(lesson['Teacher']):
+                self.names['teacher'].setdefault(normalize_key(teacher), teacher)
+                teachers.setdefault((lesson['Day'], normalize_key(teacher)), []).append(item)
+
+        self.rooms = {key: DayIntervals.build(items) for key, items in rooms.items()}
+        self.teachers = {key: DayIntervals.build(items) for key, items in teachers.items()}
+
+    def free_rooms(self, day: str, start: str, end: str) -> List[str]:
+        """
+        Rooms used somewhere in the timetable that have no lesson overlapping [start, end) on "day".
+        """
+        day = parse_day(day)
+        start_minutes, end_minutes = to_minutes(start), to_minutes(end)
+        if start_minutes >= end_minutes:
+            raise ValueError(f'Start "{start}" must be before end "{end}".')
+
+        empty = DayIntervals()
+        return sorted(
+            name for key, name in self.names['room'].items()
+            if not self.rooms.get((day, key), empty).is_busy(start_minutes, end_minutes)
+        )
+
+    def clashes(self, kind: str = 'teacher', day: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Every pair of overlapping lessons of the same teacher (kind="teacher") or in the same
+        room (kind="room").
+        """
+        if kind not in ('teacher', 'room'):
+            raise ValueError(f'Unknown clash kind "{kind}".')
+        intervals = self.teachers if kind == 'teacher' else self.rooms
+        if day is not None:
+            day = parse_day(day)
+
+        return [
+            {'day': key[0], kind: self.names[kind][key[1]], 'lessons': [first, second]}
+            for key, day_intervals in sorted(intervals.items())
+            if day is None or key[0] == day
+            for first, second in day_intervals.clashes()
+        ]
+
+
+def stored_slots(source: str) -> List[Dict[str, Any]]:
+    """
+    Slots of the timetable imported from the "source" workbook, with the speciality name in "Sheet".
+    Schedule only holds the current rows of every source, so these are its current version, even
+    though unchanged rows keep the version that first imported them.
+    """
+    rows = Schedule.objects.filter(source=source).select_related('day_of_week', 'subject', 'speciality')
+    return [
+        {
+            'Sheet': row.speciality.name,
+            'Day': row.day_of_week.name_en,
+            'Time': format_time_range(row.time_start, row.time_end),
+            'Subject': row.subject.name,
+            'Teacher': row.teacher_display or None,
+            'Room': row.room or None,
+        }
+        for row in rows
+    ]
+
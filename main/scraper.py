@@ -1,9 +1,37 @@
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from dataclasses import dataclass, field
 from json import dump, loads
 from os.path import abspath
-from pandas import DataFrame, Series, read_excel, ExcelFile
+from numpy import arange, char, maximum, ndarray, where
+from openpyxl import load_workbook
+from pandas import DataFrame, Series, isna, notna, read_excel, ExcelFile
 from re import compile
-from typing import Any, Dict, List, Union, Optional
+from typing import Any, Dict, Iterator, List, Union, Optional
+
+
+COLUMNS = ['Day', 'Time', 'Subject', 'Teacher', 'Room']
+
+TIME_PATTERN = compile(r'\d{1,2}\.\d{2}\s*-\s*\d{1,2}\.\d{2}')
+
+# Days of the week in English and every spelling of them met in the timetables.
+DAY_NAMES = {
+    'Monday': ['MONDAY', 'Дүйсенбі', 'Понедельник', 'Понеделник'],
+    'Tuesday': ['TUESDAY', 'Сейсенбі', 'Вторник'],
+    'Wednesday': ['WEDNESDAY', 'Сәрсенбі', 'Среда'],
+    'Thursday': ['THURSDAY', 'Бейсенбі', 'Четверг'],
+    'Friday': ['FRIDAY', 'Жүма', 'Жұма', 'Пятница'],
+    'Saturday': ['SATURDAY', 'Сенбі', 'Суббота', 'Cуббота']
+}
+
+# Cell contents that pandas reads as empty cells.
+NA_VALUES = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+}
+
+# The same mapping turned around (spelling -> English) so that it can be applied with Series.map.
+DAY_ALIASES = {alias: day for day, aliases in DAY_NAMES.items() for alias in aliases}
 
 
 @dataclass
@@ -13,27 +41,53 @@ class ScheduleScraper:
     
     Example usage:
     ScheduleScraper(file="timetable.xlsx", sheet_name="ИС 1ао")
+
+    An already loaded sheet can be passed as "dataframe" to skip reading the file again.
+    The sheet is cleaned with NumPy ("vectorized" engine); the "json" engine is the original
+    row-by-row implementation, kept to compare against. The "streaming" engine reads the sheet
+    with StreamingScheduleScraper instead of pandas.
     """
 
     file: str
     sheet_name: Optional[str] = None  # Make sheet_name optional
+    dataframe: Optional[DataFrame] = field(default=None, repr=False)
+    engine: str = 'vectorized'
+    schedule: Optional[List[Dict[str, Any]]] = field(default=None, init=False, repr=False)
 
     def __post_init__(self) -> Optional[List[Dict[str, Any]]]:
         if self.sheet_name is None:
             return self.list_sheet_names()  # List sheet names if none is provided
 
-        try:
-            excel_document = read_excel(self.file, self.sheet_name)
-        except ValueError as e:
-            raise ValueError(
-                f'Sheet name "{self.sheet_name}" not found.') from e
-        except FileNotFoundError as e:
-            raise FileNotFoundError(f'File "{self.file}" not found.') from e
+        if self.engine == 'streaming':
+            # Reads the sheet row by row without building a DataFrame.
+            self.schedule = list(StreamingScheduleScraper(file=self.file, sheet_name=self.sheet_name))
+            return self.schedule
 
-        filtered_excel_document = self.__return_cleaned_document(
-            excel_document)
-        json_document = loads(filtered_excel_document)
-        filtered_json_document = self.__return_cleaned_json(json_document)
+        if self.dataframe is not None:
+            excel_document = self.dataframe
+        else:
+            try:
+                excel_document = read_excel(self.file, self.sheet_name)
+            except ValueError as e:
+                raise ValueError(
+                    f'Sheet name "{self.sheet_name}" not found.') from e
+            except FileNotFoundError as e:
+                raise FileNotFoundError(f'File "{self.file}" not found.') from e
+
+        if self.engine == 'vectorized':
+            filtered_values = self.__return_cleaned_values(excel_document)
+            filtered_json_document = self.__return_cleaned_records(filtered_values)
+        elif self.engine == 'json':
+            # Cleaning renames and fills columns in place, the caller's dataframe stays intact.
+            filtered_excel_document = self.__return_cleaned_document(
+                excel_document.copy())
+            json_document = loads(filtered_excel_document)
+            filtered_json_document = self.__return_cleaned_json(json_document)
+        else:
+            raise ValueError(f'Unknown engine "{self.engine}".')
+
+        # Keeps the parsed schedule on the instance so callers don't have to parse the sheet twice.
+        self.schedule = filtered_json_document
 
         return filtered_json_document
 
@@ -75,16 +129,7 @@ class ScheduleScraper:
         """
         Helper function to convert the days of the week in Russian and Kazakh to English.
         """
-        day_dict = {
-            'Monday': ['MONDAY', 'Дүйсенбі', 'Понедельник', 'Понеделник'],
-            'Tuesday': ['TUESDAY', 'Сейсенбі', 'Вторник'],
-            'Wednesday': ['WEDNESDAY', 'Сәрсенбі', 'Среда'],
-            'Thursday': ['THURSDAY', 'Бейсенбі', 'Четверг'],
-            'Friday': ['FRIDAY', 'Жүма', 'Жұма', 'Пятница'],
-            'Saturday': ['SATURDAY', 'Сенбі', 'Суббота']
-        }
-
-        return next(k for k, v in day_dict.items() if day in v) if day else day
+        return next(k for k, v in DAY_NAMES.items() if day in v) if day else day
 
     def __fill_columns(self, dataframe: DataFrame) -> DataFrame:
         """
@@ -121,13 +166,47 @@ class ScheduleScraper:
         dataframe.dropna(subset=['Time'], inplace=True)
 
         # Takes in column names and converts output to JSON.
-        return dataframe[['Day', 'Time', 'Subject', 'Teacher', 'Room']].to_json(orient='records')
+        return dataframe[COLUMNS].to_json(orient='records')
+
+    def __forward_fill(self, values: ndarray) -> ndarray:
+        """
+        Helper function doing what "Series.ffill" does, for a NumPy column.
+        """
+        positions = where(notna(values), arange(len(values)), 0)
+        return values[maximum.accumulate(positions)]
+
+    def __return_cleaned_values(self, dataframe: DataFrame) -> ndarray:
+        """
+        Helper function doing the same as "__return_cleaned_document" on a NumPy array instead of
+        a DataFrame. Returns the Day, Time, Subject, Teacher and Room columns.
+        """
+        columns = self.__rename_columns(dataframe.columns)
+        if len(columns) != len(dataframe.columns):
+            raise ValueError(
+                f'Expected {len(columns)} columns, the sheet has {len(dataframe.columns)}.')
+
+        values = dataframe.to_numpy(dtype=object, copy=True)
+
+        # Fills in the "Unnamed: 0" column (the "Day" or "Placeholder" column) over the whole sheet.
+        first_column = dataframe.columns.get_loc('Unnamed: 0')
+        values[:, first_column] = self.__forward_fill(values[:, first_column])
+
+        # Drops the first 8 rows, then fills in the rest of the columns.
+        values = values[8:]
+        for column in ['Day', 'Teacher', 'Subject', 'Room']:
+            position = columns.index(column)
+            values[:, position] = self.__forward_fill(values[:, position])
+
+        # Drops the rows without Time.
+        values = values[notna(values[:, columns.index('Time')])]
+
+        return values[:, [columns.index(column) for column in COLUMNS]]
 
     def __return_cleaned_json(self, json: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Helper function to take a JSON output and return a clean output.
         """
-        time_pattern = compile(r'\d{1,2}\.\d{2}\s*-\s*\d{1,2}\.\d{2}')
+        time_pattern = TIME_PATTERN
 
         return [
             {
@@ -155,3 +234,201 @@ class ScheduleScraper:
                 or entry['Time'] == 'Время'
             )
         ]
+
+    def __return_cleaned_records(self, values: ndarray) -> List[Dict[str, Any]]:
+        """
+        Helper function doing the same as "__return_cleaned_json", but on whole columns at once.
+        Records are only built at the very end.
+        """
+        days, times = values[:, COLUMNS.index('Day')], values[:, COLUMNS.index('Time')]
+
+        # Keeps the rows whose "Time" looks like "8.00-8.50" and drops the header row.
+        is_time = Series(times.astype(str)).str.match(TIME_PATTERN.pattern).to_numpy(dtype=bool)
+        is_header = (days == 'Дни') | (times == 'Время')
+        values = values[is_time & ~is_header]
+
+        # Strips whitespace and converts numbers to strings. Empty cells become the string "None"
+        # and empty strings become None, just like "__replace_empty_and_numbers" does.
+        text = char.strip(values.astype(str))
+        text = where(isna(values), 'None', text).astype(object)
+        text[text == ''] = None
+
+        # Replaces the days of the week in Russian and Kazakh with English. Empty days stay empty.
+        days = char.strip(values[:, COLUMNS.index('Day')].astype(str))
+        english_days = Series(days, dtype=object).map(DAY_ALIASES).to_numpy(dtype=object)
+        unknown_days = isna(english_days) & (days != '')
+        if unknown_days.any():
+            raise ValueError(f'Unknown day of the week "{days[unknown_days][0]}".')
+        text[:, COLUMNS.index('Day')] = where(days == '', days, english_days)
+
+        return [dict(zip(COLUMNS, row)) for row in text.tolist()]
+
+
+@dataclass
+class StreamingScheduleScraper:
+    """
+    Alternative to ScheduleScraper for large workbooks. The sheet is read row by row with openpyxl
+    in read-only mode and records are yielded one at a time, so memory does not grow with the
+    size of the sheet.
+
+    Rows are cleaned like ScheduleScraper does: the first 8 rows only feed the forward-fill of the
+    first column, Day/Teacher/Subject/Room are forward-filled, rows without a "8.00-8.50" time
+    and header rows are dropped and days are converted to English. The layout (with or without a
+    placeholder column) is detected from the column the first time is found in.
+    Numbers keep the form they have in the cell, pandas may turn them into floats.
+
+    Example usage:
+    for entry in StreamingScheduleScraper(file="timetable.xlsx", sheet_name="ИС 1ао"):
+        ...
+    """
+
+    file: str
+    sheet_name: str
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        try:
+            workbook = load_workbook(self.file, read_only=True, data_only=True)
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f'File "{self.file}" not found.') from e
+
+        try:
+            if self.sheet_name not in workbook.sheetnames:
+                raise ValueError(f'Sheet name "{self.sheet_name}" not found.')
+
+            yield from self.__iter_records(workbook[self.sheet_name].iter_rows(values_only=True))
+        finally:
+            workbook.close()
+
+    def __convert_cell(self, value: Any) -> Any:
+        """
+        Helper function to read a cell the way pandas does: empty cells become None and
+        whole floats become integers.
+        """
+        if value is None or (isinstance(value, str) and value in NA_VALUES):
+            return None
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        return value
+
+    def __clean_cell(self, value: Any) -> Optional[str]:
+        """
+        Helper function doing what "ScheduleScraper.__replace_empty_and_numbers" does for one cell.
+        """
+        return (value.strip() if isinstance(value, str) else str(value)) or None
+
+    def __iter_records(self, rows: Iterator[tuple]) -> Iterator[Dict[str, Any]]:
+        # The first row is the header row, pandas turns it into column names.
+        next(rows, None)
+
+        first_column_carry = None
+        carry: Dict[int, Any] = {}
+        time_column = None
+
+        for index, row in enumerate(rows):
+            cells = [self.__convert_cell(value) for value in row]
+            cells += [None] * (6 - len(cells))
+
+            # Fills in the first column over the whole sheet.
+            if cells[0] is None:
+                cells[0] = first_column_carry
+            else:
+                first_column_carry = cells[0]
+
+            # Drops the first 8 rows.
+            if index < 8:
+                continue
+
+            # Forward-fills every column; only Day, Subject, Teacher and Room use the filled values.
+            filled = list(cells)
+            for position, value in enumerate(cells):
+                if value is None:
+                    filled[position] = carry.get(position)
+                else:
+                    carry[position] = value
+
+            if time_column is None:
+                time_column = next(
+                    (position for position in (1, 2)
+                     if isinstance(cells[position], str) and TIME_PATTERN.match(cells[position])),
+                    None)
+                if time_column is None:
+                    continue
+
+            day, time = filled[time_column - 1], cells[time_column]
+
+            # Checks if the "Time" entry matches the time pattern and skips header rows.
+            if not (isinstance(time, str) and TIME_PATTERN.match(time)):
+                continue
+            if day == 'Дни' or time == 'Время':
+                continue
+
+            entry = {
+                column: self.__clean_cell(value)
+                for column, value in zip(COLUMNS, [day, time] + filled[time_column + 1:time_column + 4])
+            }
+
+            day = day.strip() if isinstance(day, str) else str(day)
+            if day and day not in DAY_ALIASES:
+                raise ValueError(f'Unknown day of the week "{day}".')
+            entry['Day'] = DAY_ALIASES[day] if day else day
+
+            yield entry
+
+
+def _scrape_sheet(file: str, sheet_name: str, dataframe: DataFrame) -> List[Dict[str, Any]]:
+    """
+    Helper function to clean one already loaded sheet.
+    """
+    try:
+        return ScheduleScraper(file=file, sheet_name=sheet_name, dataframe=dataframe).schedule
+    except Exception as e:
+        raise ValueError(f'Sheet "{sheet_name}" could not be parsed: {e!r}') from e
+
+
+def _load_sheets(file: str, sheet_names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Helper function to read and clean a group of sheets with one workbook read. Lives on the
+    module level so that it can be sent to worker processes.
+    """
+    with ExcelFile(file) as xls:
+        return {name: _scrape_sheet(file, name, xls.parse(name)) for name in sheet_names}
+
+
+def load_workbook_schedules(
+    file: str,
+    sheet_names: Optional[List[str]] = None,
+    max_workers: int = 1,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Opens the workbook once, reads every sheet (or only "sheet_names") and cleans them.
+    Reading the sheets takes far longer than cleaning them, so with "max_workers" > 1 the sheets
+    are split between worker processes that each read and clean their share.
+
+    Example usage:
+    load_workbook_schedules(file="timetable.xlsx")
+    load_workbook_schedules(file="timetable.xlsx", sheet_names=["ИС 1ао"])
+    load_workbook_schedules(file="timetable.xlsx", max_workers=4)
+    """
+    try:
+        with ExcelFile(file) as xls:
+            names = xls.sheet_names if sheet_names is None else list(sheet_names)
+
+            missing = [name for name in names if name not in xls.sheet_names]
+            if missing:
+                raise ValueError(
+                    f'Sheet names {", ".join(map(repr, missing))} not found.')
+
+            # Starting worker processes costs more than a whole serial load of a typical workbook.
+            if max_workers <= 1 or len(names) < 2:
+                return {name: _scrape_sheet(file, name, xls.parse(name)) for name in names}
+    except FileNotFoundError as e:
+        raise FileNotFoundError(f'File "{file}" not found.') from e
+
+    # Only asked for by management commands. Spawned, not forked: a child forked while another
+    # thread holds a lock (logging, database) can deadlock.
+    groups = [names[start::max_workers] for start in range(min(max_workers, len(names)))]
+    schedules: Dict[str, List[Dict[str, Any]]] = {}
+    with ProcessPoolExecutor(max_workers=len(groups), mp_context=get_context('spawn')) as executor:
+        for loaded in executor.map(_load_sheets, [file] * len(groups), groups):
+            schedules.update(loaded)
+    return {name: schedules[name] for name in names}
@@ -0,0 +1,64 @@
+from re import compile
+from typing import List
+
+from django.db import connection
+from django.db.models import BooleanField, F, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+
+WORD_PATTERN = compile(r'\w+')
+
+# Must stay the same expression as application_search_idx (migration 0012), or PostgreSQL won't use the index.
+POSTGRES_DOCUMENT = "to_tsvector('simple', coalesce(main_application.title, '') || ' ' || coalesce(main_application.description, ''))"
+
+
+def search_words(query: str) -> List[str]:
+    return WORD_PATTERN.findall(query.lower())
+
+
+def fts_query(words: List[str]) -> str:
+    """
+    FTS5 query where every word must appear, as a prefix: "перев заяв" finds "перевод" in
+    "Заявление на перевод". Words are quoted, so user input can't use the FTS5 query syntax.
+    """
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_applications(queryset, query: str):
+    """
+    Narrows an Application queryset to the applications whose title or description contain every
+    word of the query, annotated with "search_rank" (higher is better) and ordered by it.
+
+    SQLite uses the main_application_fts table, PostgreSQL the application_search_idx index.
+    Other databases fall back to a case-insensitive substring match without ranking.
+
+    Example usage:
+    search_applications(Application.objects.filter(status="done"), "перевод")
+    """
+    words = search_words(query)
+    if not words:
+        return queryset.none()
+
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        # The FTS table is joined once: MATCH finds the rows through the index, and bm25() (lower is
+        # better) ranks them in the same pass. extra() because the ORM can't join a virtual table.
+        return queryset.extra(
+            tables=['main_application_fts'],
+            where=['main_application_fts.rowid = main_application.id', 'main_application_fts MATCH %s'],
+            params=[fts_query(words)],
+            select={'search_rank': '-bm25(main_application_fts)'},
+        ).order_by('-search_rank', '-created_at', '-id')
+
+    if vendor == 'postgresql':
+        tsquery = ' & '.join(f"{word}:*" for word in words)
+        queryset = queryset.alias(search_match=RawSQL(
+            f"{POSTGRES_DOCUMENT} @@ to_tsquery('simple', %s)", [tsquery], output_field=BooleanField(),
+        )).filter(search_match=True)
+        rank = RawSQL(f"ts_rank({POSTGRES_DOCUMENT}, to_tsquery('simple', %s))", [tsquery],
+                      output_field=FloatField())
+        return queryset.annotate(search_rank=rank).order_by(F('search_rank').desc(), '-created_at', '-id')
+
+    for word in words:
+        queryset = queryset.filter(Q(title__icontains=word) | Q(description__icontains=word))
+    return queryset.order_by('-created_at', '-id')
@@ -1,120 +1,149 @@
-from rest_framework import serializers
 from .models import (Student, Faculty, StudentOfFaculty, Speciality, Teacher, Subject, Language, 
                      StudentStatus, News, Notification, Application, ApplicationStatus, 
                      StudentOfLanguage, StudentOfSpeciality, TypeOfGrades, Grade, 
                      DayOfWeek, ScheduleVersion, Schedule, ApplicationInformation, Category, Executor, Responsible)
+from .expand import ExpandableSerializerMixin
+from .fieldsets import SparseModelSerializer
 
-class FacultySerializer(serializers.ModelSerializer):
+class FacultySerializer(SparseModelSerializer):
     class Meta:
         model = Faculty
         fields = '__all__'
 
-class SpecialitySerializer(serializers.ModelSerializer):
+class SpecialitySerializer(SparseModelSerializer):
     class Meta:
         model = Speciality
         fields = '__all__'
 
-class TeacherSerializer(serializers.ModelSerializer):
+class TeacherSerializer(SparseModelSerializer):
     class Meta:
         model = Teacher
         fields = '__all__'
 
-class SubjectSerializer(serializers.ModelSerializer):
+class SubjectSerializer(SparseModelSerializer):
     class Meta:
         model = Subject
         fields = '__all__'
 
-class LanguageSerializer(serializers.ModelSerializer):
+class LanguageSerializer(SparseModelSerializer):
     class Meta:
         model = Language
         fields = '__all__'
 
-class StudentStatusSerializer(serializers.ModelSerializer):
+class StudentStatusSerializer(SparseModelSerializer):
     class Meta:
         model = StudentStatus
         fields = '__all__'
 
-class NewsSerializer(serializers.ModelSerializer):
+class NewsSerializer(SparseModelSerializer):
     class Meta:
         model = News
         fields = '__all__'
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseModelSerializer):
     class Meta:
         model = Notification
         fields = '__all__'
 
-class ApplicationSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Application
-        fields = '__all__'
-
-class ApplicationInformationSerializer(serializers.ModelSerializer):
+class ApplicationInformationSerializer(SparseModelSerializer):
     class Meta:
         model = ApplicationInformation
         fields = '__all__'
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseModelSerializer):
     class Meta:
         model = Category
         fields = '__all__'
 
-class ExecutorSerializer(serializers.ModelSerializer):
+class ExecutorSerializer(SparseModelSerializer):
     class Meta:
         model = Executor
         fields = '__all__'
 
-class ResponsibleSerializer(serializers.ModelSerializer):
+class ResponsibleSerializer(SparseModelSerializer):
     class Meta:
         model = Responsible
         fields = '__all__'
 
-class ApplicationStatusSerializer(serializers.ModelSerializer):
+class ApplicationSerializer(ExpandableSerializerMixin, SparseModelSerializer):
+    class Meta:
+        model = Application
+        fields = '__all__'
+        read_only_fields = ('pdf_file', 'pdf_status', 'pdf_hash')
+        expandable_fields = {
+            'category': CategorySerializer,
+            'responsible': ResponsibleSerializer,
+            'executor': ExecutorSerializer,
+        }
+
+class ApplicationStatusSerializer(SparseModelSerializer):
     class Meta:
         model = ApplicationStatus
         fields = '__all__'
 
-class TypeOfGradesSerializer(serializers.ModelSerializer):
+class TypeOfGradesSerializer(SparseModelSerializer):
     class Meta:
         model = TypeOfGrades
         fields = '__all__'
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(ExpandableSerializerMixin, SparseModelSerializer):
     class Meta:
         model = Student
         fields = '__all__'
+        expandable_fields = {
+            'speciality': SpecialitySerializer,
+            'status': StudentStatusSerializer,
+            'current_faculty': FacultySerializer,
+            'faculties': FacultySerializer,
+        }
 
-class GradeSerializer(serializers.ModelSerializer):
+class GradeSerializer(ExpandableSerializerMixin, SparseModelSerializer):
     class Meta:
         model = Grade
         fields = '__all__'
+        expandable_fields = {
+            'student': StudentSerializer,
+            'subject': SubjectSerializer,
+            'faculty': FacultySerializer,
+            'speciality': SpecialitySerializer,
+            'grade_type': TypeOfGradesSerializer,
+            'teacher': TeacherSerializer,
+        }
 
-class StudentOfFacultySerializer(serializers.ModelSerializer):
+class StudentOfFacultySerializer(SparseModelSerializer):
     class Meta:
         model = StudentOfFaculty
         fields = '__all__'
 
-class StudentOfSpecialitySerializer(serializers.ModelSerializer):
+class StudentOfSpecialitySerializer(SparseModelSerializer):
     class Meta:
         model = StudentOfSpeciality
         fields = '__all__'
 
-class StudentOfLanguageSerializer(serializers.ModelSerializer):
+class StudentOfLanguageSerializer(SparseModelSerializer):
     class Meta:
         model = StudentOfLanguage
         fields = '__all__'
 
-class DayOfWeekSerializer(serializers.ModelSerializer):
+class DayOfWeekSerializer(SparseModelSerializer):
     class Meta:
         model = DayOfWeek
         fields = '__all__'
 
-class ScheduleVersionSerializer(serializers.ModelSerializer):
+class ScheduleVersionSerializer(SparseModelSerializer):
     class Meta:
         model = ScheduleVersion
         fields = '__all__'
 
-class ScheduleSerializer(serializers.ModelSerializer):
+class ScheduleSerializer(ExpandableSerializerMixin, SparseModelSerializer):
     class Meta:
         model = Schedule
         fields = '__all__'
+        expandable_fields = {
+            'day_of_week': DayOfWeekSerializer,
+            'subject': SubjectSerializer,
+            'teacher': TeacherSerializer,
+            'speciality': SpecialitySerializer,
+            'language': LanguageSerializer,
+            'version': ScheduleVersionSerializer,
+        }
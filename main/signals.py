@@ -1,7 +1,9 @@
-from django.db.models.signals import post_save, post_migrate
+from django.db.models.signals import post_delete, post_init, post_save, post_migrate
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import TypeOfGrades, DayOfWeek
+from .models import Application, TypeOfGrades, DayOfWeek
+from .counters import counter_keys, move_counters
+from .reference import REFERENCE_MODELS, bump_reference_version
 
 @receiver(post_migrate)
 def create_grade_types(sender, **kwargs):
@@ -23,6 +25,40 @@ def create_grade_types(sender, **kwargs):
 
 
 
+# Счётчики заявлений: при загрузке запоминаем значения, при сохранении переносим разницу.
+@receiver(post_init, sender=Application)
+def remember_application_counter_keys(sender, instance, **kwargs):
+    instance._counter_keys = counter_keys(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Application)
+def update_application_counters(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_keys = None if created else instance._counter_keys
+    new_keys = counter_keys(instance)
+    if new_keys is None or (old_keys is None and not created):
+        # Заявление загружено через .only()/.defer(): расхождение исправит reconcile_application_counters.
+        return
+    move_counters(old_keys, new_keys)
+    instance._counter_keys = new_keys
+
+
+@receiver(post_delete, sender=Application)
+def remove_application_counters(sender, instance, **kwargs):
+    move_counters(instance._counter_keys or counter_keys(instance), None)
+
+
+# Справочники: любое изменение делает устаревшими все закэшированные ответы и ETag.
+def reference_changed(sender, **kwargs):
+    bump_reference_version()
+
+
+for reference_model in REFERENCE_MODELS:
+    post_save.connect(reference_changed, sender=reference_model)
+    post_delete.connect(reference_changed, sender=reference_model)
+
+
 def create_weekdays(sender, **kwargs):
     weekdays = [
         {'name_en': 'Monday', 'name_kz': 'Дүйсенбі', 'name_ru': 'Понедельник'},
@@ -1,5 +1,951 @@
-from django.test import TestCase
+import gc
+import io
+import json
+import os
+import zipfile
+import shutil
+import tempfile
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from unittest import mock
+from urllib.parse import quote
 
-from scraper import ScheduleScraper
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import ProtectedError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from pandas import ExcelFile
+from reportlab.pdfbase import pdfmetrics
 
-ScheduleScraper('timetable.xlsx', 'SE,DS+НИШ 2кАО')
+from main.counters import reconcile_counters
+from main.models import (Application, ApplicationCounter, Faculty, Grade, PdfRenderJob, Schedule, ScheduleSheet,
+                         Speciality, Student, StudentStatus, Subject, Teacher, TypeOfGrades)
+from main.pagination import MAX_PAGE_SIZE
+from main.pdf import (claim_jobs, ensure_application_pdf, fail_jobs, init_render_worker, prepare_renderer,
+                      render_applications, render_pdf, write_application_pdf)
+from main.reference import VERSION_KEY, reference_version
+from main.schedule_cache import TimetableSnapshot, TimetableWatcher
+from main.schedule_index import TimetableIndex
+from main.schedule_import import ScheduleImport, sheet_fingerprint, stored_schedule
+from main.schedule_query import DayIntervals, ScheduleIntervals, parse_day, stored_slots, to_minutes
+from main.scraper import ScheduleScraper, StreamingScheduleScraper, load_workbook_schedules
+from main.search import search_applications
+from main.timetable_registry import TimetableRegistry, TimetableSource, should_watch
+
+
+TIMETABLE = os.path.join(settings.BASE_DIR, 'timetable.xlsx')
+
+
+class ScheduleScraperTests(SimpleTestCase):
+    def test_matches_golden_output(self):
+        with open(os.path.join(settings.BASE_DIR, 'data.json'), encoding='utf-8') as golden:
+            expected = json.load(golden)
+
+        self.assertEqual(ScheduleScraper(TIMETABLE, 'SE,DS+НИШ 2кАО').schedule, expected)
+
+    def test_engines_agree_on_every_sheet(self):
+        with ExcelFile(TIMETABLE) as xls:
+            for sheet_name in xls.sheet_names:
+                dataframe = xls.parse(sheet_name)
+                with self.subTest(sheet_name=sheet_name):
+                    self.assertEqual(
+                        ScheduleScraper(TIMETABLE, sheet_name, dataframe=dataframe).schedule,
+                        ScheduleScraper(TIMETABLE, sheet_name, dataframe=dataframe, engine='json').schedule,
+                    )
+
+    def test_streaming_engine_matches_vectorized(self):
+        with ExcelFile(TIMETABLE) as xls:
+            for sheet_name in xls.sheet_names:
+                dataframe = xls.parse(sheet_name)
+                with self.subTest(sheet_name=sheet_name):
+                    self.assertEqual(
+                        ScheduleScraper(TIMETABLE, sheet_name, engine='streaming').schedule,
+                        ScheduleScraper(TIMETABLE, sheet_name, dataframe=dataframe).schedule,
+                    )
+
+    def test_streaming_engine_unknown_sheet(self):
+        with self.assertRaisesMessage(ValueError, 'Sheet name "Нет такого листа" not found.'):
+            list(StreamingScheduleScraper(TIMETABLE, 'Нет такого листа'))
+
+
+class WorkbookLoadingTests(SimpleTestCase):
+    def test_process_pool_matches_serial_loading(self):
+        with ExcelFile(TIMETABLE) as xls:
+            sheet_names = xls.sheet_names[:3]
+
+        parallel = load_workbook_schedules(TIMETABLE, sheet_names=sheet_names, max_workers=2)
+        self.assertEqual(list(parallel), sheet_names)
+        self.assertEqual(parallel, load_workbook_schedules(TIMETABLE, sheet_names=sheet_names, max_workers=1))
+        self.assertEqual(parallel[sheet_names[0]], ScheduleScraper(TIMETABLE, sheet_names[0]).schedule)
+
+    def test_no_pool_unless_asked_for(self):
+        with mock.patch('main.scraper.ProcessPoolExecutor') as pool:
+            snapshot = TimetableSnapshot.load(TIMETABLE)
+
+        pool.assert_not_called()
+        self.assertEqual(len(snapshot.schedules), len(ScheduleScraper(TIMETABLE).list_sheet_names()))
+
+    def test_workbook_is_opened_once(self):
+        with mock.patch('main.scraper.ExcelFile', wraps=ExcelFile) as excel_file, \
+                mock.patch('main.scraper.read_excel') as read_excel:
+            schedules = load_workbook_schedules(TIMETABLE, max_workers=1)
+
+        excel_file.assert_called_once_with(TIMETABLE)
+        read_excel.assert_not_called()
+        self.assertEqual(list(schedules), ScheduleScraper(TIMETABLE).list_sheet_names())
+
+    def test_unknown_sheet(self):
+        with self.assertRaisesMessage(ValueError, "'Нет такого листа'"):
+            load_workbook_schedules(TIMETABLE, sheet_names=['Нет такого листа'])
+
+
+class TimetableWatcherTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.file = shutil.copy(TIMETABLE, os.path.join(directory, 'timetable.xlsx'))
+
+    def test_concurrent_callers_share_one_load(self):
+        watcher = TimetableWatcher(self.file)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            snapshots = list(executor.map(lambda _: watcher.snapshot(), range(4)))
+
+        self.assertEqual(watcher.loads, 1)
+        self.assertTrue(all(snapshot is snapshots[0] for snapshot in snapshots))
+
+    def test_changed_workbook_gets_a_new_snapshot(self):
+        watcher = TimetableWatcher(self.file)
+        snapshot = watcher.snapshot()
+        self.assertIs(watcher.snapshot(), snapshot)
+
+        os.utime(self.file, ns=(snapshot.stamp[0] + 10 ** 9, snapshot.stamp[0] + 10 ** 9))
+        self.assertIsNot(watcher.snapshot(), snapshot)
+        self.assertEqual(watcher.loads, 2)
+
+    def test_stats_count_hits_and_loads(self):
+        watcher = TimetableWatcher(self.file)
+        self.assertEqual(watcher.stats()['loaded'], False)
+
+        snapshot = watcher.snapshot()
+        watcher.snapshot()
+        stats = watcher.stats()
+        self.assertEqual((stats['hits'], stats['loads'], stats['errors']), (1, 1, 0))
+        self.assertEqual(stats['sheets'], len(snapshot.schedules))
+        self.assertGreater(stats['size'], 0)
+
+        # Clearing drops the snapshot, the next call parses the workbook again.
+        watcher.clear()
+        self.assertFalse(watcher.stats()['loaded'])
+        self.assertIsNot(watcher.snapshot(), snapshot)
+        self.assertEqual(watcher.stats()['loads'], 2)
+
+    def test_missing_workbook(self):
+        os.remove(self.file)
+        with self.assertRaisesMessage(FileNotFoundError, 'not found'):
+            TimetableWatcher(self.file).snapshot()
+
+
+class TimetableRegistryTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.sources = [
+            TimetableSource(key, shutil.copy(TIMETABLE, os.path.join(directory, f'{key}.xlsx')))
+            for key in ('fall', 'spring')
+        ]
+
+    def test_finds_sheet_by_speciality_name(self):
+        registry = TimetableRegistry(self.sources)
+
+        source, sheet_name = registry.find_sheet('МОиЭ2кРО')
+        self.assertEqual((source.key, sheet_name), ('fall', 'МОиЭ2кРО '))
+        self.assertIsNone(registry.find_sheet('Несуществующий лист'))
+
+    def test_watchers_are_opt_in(self):
+        with mock.patch('sys.argv', ['gunicorn', 'students_app.wsgi']):
+            self.assertFalse(should_watch())
+            with override_settings(TIMETABLE_WATCH=True):
+                self.assertTrue(should_watch())
+        with mock.patch('sys.argv', ['manage.py', 'test']), override_settings(TIMETABLE_WATCH=True):
+            self.assertFalse(should_watch())
+
+    def test_eviction_frees_the_interval_structures(self):
+        registry = TimetableRegistry(self.sources, memory_budget=1)
+        intervals = weakref.ref(registry.snapshot('fall').intervals)
+        self.assertIs(registry.snapshot('fall').intervals, intervals())
+
+        registry.snapshot('spring')
+        gc.collect()
+        self.assertIsNone(intervals())
+
+    def test_evicts_least_recently_used_workbook_over_budget(self):
+        registry = TimetableRegistry(self.sources, memory_budget=1)
+        fall = registry.snapshot('fall')
+        registry.snapshot('spring')
+
+        self.assertEqual(registry.evictions, 1)
+        self.assertIsNot(registry.snapshot('fall'), fall)
+
+
+class TimetableIndexTests(SimpleTestCase):
+    def test_build(self):
+        entry = {'Day': 'Monday', 'Time': '8.00-8.50', 'Subject': 'Математика',
+                 'Teacher': 'Карабаев А.С., Корабаева Е.А.', 'Room': 'а402,\n309'}
+        index = TimetableIndex.build(TIMETABLE, {
+            'SE 1кРО': [entry],
+            'DS 1кРО': [{**entry, 'Subject': 'None', 'Teacher': 'карабаев  а.с.', 'Room': '309'}],
+        }, (0, 0))
+
+        self.assertEqual([slot['Sheet'] for slot in index.teacher('КАРАБАЕВ А.С.')], ['SE 1кРО', 'DS 1кРО'])
+        self.assertEqual(len(index.teacher('Корабаева Е.А.')), 1)
+        self.assertEqual(len(index.room('309')), 2)
+        self.assertEqual(index.room('А402')[0]['Sheet'], 'SE 1кРО')
+        self.assertEqual(len(index.subject(' математика ')), 1)
+        self.assertEqual(index.subject('None'), [])
+        self.assertEqual(len(index.slots), 2)
+
+    def test_endpoints(self):
+        registry = TimetableRegistry([TimetableSource('default', TIMETABLE)])
+        index = registry.snapshot().index
+        teacher = next(slot['Teacher'] for slot in index.slots if slot['Teacher'] and ',' not in slot['Teacher'])
+
+        with mock.patch('main.views.get_registry', return_value=registry):
+            response = self.client.get(f'/api/timetable/teacher/{quote(teacher.upper())}/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['count'], len(index.teacher(teacher)))
+            self.assertTrue(all(teacher in slot['Teacher'] for slot in response.json()['slots']))
+
+            room = response.json()['slots'][0]['Room'].split(',')[0].strip()
+            self.assertGreaterEqual(self.client.get(f'/api/timetable/room/{quote(room)}/').json()['count'], 1)
+            subject = response.json()['slots'][0]['Subject']
+            self.assertEqual(self.client.get(f'/api/timetable/subject/{quote(subject, safe="")}/').json()['count'],
+                             len(index.subject(subject)))
+
+            self.assertEqual(self.client.get('/api/timetable/teacher/Нет Такого/').status_code, 404)
+            self.assertEqual(self.client.get('/api/timetable/teacher/x/', {'source': 'winter'}).status_code, 404)
+
+
+def slot(sheet, day, time, teacher, room, subject='Математика'):
+    return {'Sheet': sheet, 'Day': day, 'Time': time, 'Subject': subject, 'Teacher': teacher, 'Room': room}
+
+
+class ScheduleIntervalsTests(SimpleTestCase):
+    def setUp(self):
+        self.intervals = ScheduleIntervals([
+            slot('SE 1кРО', 'Tuesday', '8.00-8.50', 'Карабаев А.С.', '101'),
+            # The same lecture given to two groups at once is one lesson, not a clash.
+            slot('DS 1кРО', 'Tuesday', '8.00-8.50', 'Карабаев А.С.', '101', subject='Математика '),
+            slot('DS 1кРО', 'Tuesday', '8.30-9.20', 'Карабаев А.С.', '102'),
+            slot('SE 1кРО', 'Tuesday', '11.10-12.00', 'Корабаева Е.А.', '103'),
+            slot('SE 1кРО', 'Wednesday', '8.00-8.50', 'Корабаева Е.А.', 'https://online.example'),
+        ])
+
+    def test_to_minutes(self):
+        self.assertEqual(to_minutes('11.10'), 670)
+        self.assertEqual(to_minutes('11:10'), 670)
+        self.assertEqual(to_minutes('9'), 540)
+        for value in ('11.1', 'abc', '25.00', '11.60', ''):
+            with self.subTest(value=value), self.assertRaisesMessage(ValueError, 'is not in the "11.10" format'):
+                to_minutes(value)
+
+    def test_day_intervals(self):
+        day = DayIntervals.build([(480, 530, {'n': 1}), (600, 650, {'n': 2}), (500, 700, {'n': 3})])
+
+        self.assertTrue(day.is_busy(520, 540))
+        self.assertTrue(day.is_busy(690, 720))
+        self.assertFalse(day.is_busy(700, 760))
+        self.assertFalse(day.is_busy(400, 480))
+        self.assertEqual({(first['n'], second['n']) for first, second in day.clashes()}, {(1, 3), (3, 2)})
+
+    def test_clashes(self):
+        clashes = self.intervals.clashes('teacher')
+
+        self.assertEqual(len(clashes), 1)
+        self.assertEqual(clashes[0]['teacher'], 'Карабаев А.С.')
+        self.assertEqual(clashes[0]['lessons'][0]['Sheets'], ['SE 1кРО', 'DS 1кРО'])
+        self.assertEqual(self.intervals.clashes('room'), [])
+        self.assertEqual(self.intervals.clashes('teacher', day='Среда'), [])
+
+    def test_free_rooms(self):
+        self.assertEqual(self.intervals.free_rooms('Tuesday', '8.00', '8.50'), ['103'])
+        self.assertEqual(self.intervals.free_rooms('вторник', '8.50', '11.10'), ['101', '103'])
+        self.assertEqual(self.intervals.free_rooms('Wednesday', '8.00', '9.00'), ['101', '102', '103'])
+        with self.assertRaisesMessage(ValueError, 'must be before end'):
+            self.intervals.free_rooms('Tuesday', '9.00', '8.00')
+
+    def test_unknown_day(self):
+        self.assertEqual(parse_day('Сейсенбі'), 'Tuesday')
+        with self.assertRaisesMessage(ValueError, 'Unknown day "Funday"'):
+            self.intervals.free_rooms('Funday', '8.00', '9.00')
+
+        response = self.client.get('/api/timetable/free-rooms/', {'day': 'Funday', 'start': '8.00', 'end': '9.00'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Unknown day', response.json()['detail'])
+        response = self.client.get('/api/timetable/free-rooms/', {'day': 'Tuesday', 'start': '11.1', 'end': '12'})
+        self.assertEqual(response.status_code, 400)
+
+
+class PdfRendererTests(SimpleTestCase):
+    def test_template_and_fonts_are_loaded_once_per_process(self):
+        template = prepare_renderer()
+        with mock.patch('main.pdf.get_template') as get_template, \
+                mock.patch('main.pdf.pdfmetrics.registerFont') as register_font:
+            self.assertIs(prepare_renderer(), template)
+            init_render_worker()
+
+        get_template.assert_not_called()
+        register_font.assert_not_called()
+        self.assertIn('DejaVuSans-Bold', pdfmetrics.getRegisteredFontNames())
+
+    def test_cyrillic_text_uses_the_bundled_font(self):
+        pdf = render_pdf('<html><body><p style="font-family: \'DejaVu Sans\'">Заявление</p></body></html>')
+
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertIn(b'DejaVuSans', pdf)
+
+
+@override_settings(APPLICATION_PDF_EAGER=True)
+class PdfRenderQueueTests(TestCase):
+    def setUp(self):
+        student = User.objects.create_user(username='student')
+        self.application = Application.objects.create(student=student, title='Справка', description='С места учебы')
+
+    def test_save_only_enqueues_a_job(self):
+        self.application.save()
+        self.application.save(update_fields=['pdf_status'])
+
+        self.assertEqual(PdfRenderJob.objects.filter(application=self.application, status='pending').count(), 2)
+        self.assertEqual(self.application.pdf_status, 'pending')
+        self.assertFalse(self.application.pdf_file)
+
+    def test_enqueued_render_resets_the_pdf_status(self):
+        Application.objects.filter(pk=self.application.pk).update(pdf_status='ready')
+        self.application.refresh_from_db()
+        self.application.description = 'С места работы'
+        self.application.save(update_fields=['description'])
+
+        self.application.refresh_from_db()
+        self.assertEqual(self.application.pdf_status, 'pending')
+
+    def test_jobs_of_one_application_are_claimed_together(self):
+        self.application.save()
+
+        claimed = claim_jobs(10)
+        self.assertEqual(list(claimed), [self.application.id])
+        self.assertEqual(len(claimed[self.application.id]), 2)
+        self.assertFalse(PdfRenderJob.objects.filter(status='pending').exists())
+
+    def test_failed_job_is_retried_until_out_of_attempts(self):
+        job_ids = claim_jobs(1)[self.application.id]
+        self.assertFalse(fail_jobs(self.application.id, job_ids, 'error', max_attempts=2))
+        self.assertEqual(PdfRenderJob.objects.get(id__in=job_ids).status, 'pending')
+
+        job_ids = claim_jobs(1)[self.application.id]
+        self.assertTrue(fail_jobs(self.application.id, job_ids, 'error', max_attempts=2))
+        self.application.refresh_from_db()
+        self.assertEqual(self.application.pdf_status, 'failed')
+
+    def test_unchanged_content_is_not_rendered_again(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+
+        with override_settings(MEDIA_ROOT=media_root):
+            first = write_application_pdf(self.application)
+            self.application.pdf_hash = first['hash']
+            self.application.status = 'done'
+            second = write_application_pdf(self.application)
+
+        self.assertTrue(first['rendered'])
+        self.assertFalse(second['rendered'])
+        self.assertEqual(first['name'], second['name'])
+
+
+class InlineExecutor:
+    """
+    Runs submitted calls right away in this process, so they see the test database.
+    """
+
+    def __init__(self, max_workers=None, mp_context=None, initializer=None):
+        if initializer is not None:
+            initializer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, function, *args):
+        future = Future()
+        future.set_result(function(*args))
+        return future
+
+
+@mock.patch('main.management.commands.regenerate_pdfs.ProcessPoolExecutor', InlineExecutor)
+class RegeneratePdfsTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+        student = User.objects.create_user(username='student')
+        self.applications = [
+            Application.objects.create(student=student, title='Справка', description=f'С места учебы {index}')
+            for index in range(3)
+        ]
+
+    def regenerate(self):
+        stdout = io.StringIO()
+        call_command('regenerate_pdfs', '--workers=1', '--batch-size=1', stdout=stdout, stderr=io.StringIO())
+        return stdout.getvalue()
+
+    def test_renders_and_stores_every_pdf(self):
+        self.assertIn('3 PDFs rendered, 0 unchanged, 0 failed', self.regenerate())
+
+        for application in Application.objects.all():
+            self.assertEqual(application.pdf_status, 'ready')
+            self.assertTrue(os.path.exists(os.path.join(settings.MEDIA_ROOT, application.pdf_file.name)))
+        self.assertFalse(PdfRenderJob.objects.exists())
+        self.assertIn('0 PDFs rendered, 3 unchanged', self.regenerate())
+
+    def test_interrupted_run_resumes_where_it_stopped(self):
+        calls = []
+
+        def interrupted(application_ids, force):
+            calls.append(application_ids)
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+            return render_applications(application_ids, force)
+
+        with mock.patch('main.management.commands.regenerate_pdfs.render_applications', interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                self.regenerate()
+
+        statuses = Application.objects.order_by('id').values_list('pdf_status', flat=True)
+        self.assertEqual(list(statuses), ['ready', 'ready', 'not_generated'])
+        self.assertIn('1 PDFs rendered, 2 unchanged', self.regenerate())
+
+
+class ApplicationPdfDownloadTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+        self.student = User.objects.create_user(username='student')
+        self.application = Application.objects.create(student=self.student, title='Справка', description='С места учебы')
+        self.url = f'/api/applications/{self.application.id}/pdf/'
+
+    def test_renders_on_first_download_and_revalidates(self):
+        self.client.force_login(self.student)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        self.application.refresh_from_db()
+        self.assertEqual(self.application.pdf_status, 'ready')
+
+        with mock.patch('main.views.ensure_application_pdf') as ensure:
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        ensure.assert_not_called()
+
+    def test_edits_invalidate_the_stored_pdf(self):
+        self.assertEqual(self.application.pdf_status, 'not_generated')
+        ensure_application_pdf(self.application)
+        etag = f'"{self.application.pdf_hash}"'
+
+        self.application.description = 'С места работы'
+        self.application.save(update_fields=['description'])
+        self.application.refresh_from_db()
+        self.assertEqual(self.application.pdf_status, 'stale')
+
+        self.client.force_login(self.student)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.application.refresh_from_db()
+        self.assertEqual(self.application.pdf_status, 'ready')
+
+    def test_concurrent_writers_do_not_collide(self):
+        application = Application.objects.select_related('student', 'responsible', 'executor', 'category').get(
+            pk=self.application.pk)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: write_application_pdf(application, force=True), range(4)))
+
+        directory = os.path.dirname(os.path.join(settings.MEDIA_ROOT, results[0]['name']))
+        self.assertEqual(os.listdir(directory), [f'application_{application.id}.pdf'])
+
+    def test_byte_range(self):
+        self.client.force_login(self.student)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-3')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF')
+
+    def read_archive(self, response):
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertIsNone(archive.testzip())
+            return archive.namelist(), archive.read('manifest.csv').decode('utf-8-sig')
+
+    def test_archive_contains_pdfs_and_manifest(self):
+        ensure_application_pdf(self.application)
+        self.client.force_login(self.student)
+        names, manifest = self.read_archive(self.client.get('/api/applications/pdf-archive/'))
+
+        self.assertEqual(len(names), 2)
+        self.assertIn(f'application_{self.application.id}.pdf', names[0])
+        self.assertIn('Справка', manifest)
+
+    def test_archive_lists_missing_pdfs_without_rendering_them(self):
+        self.client.force_login(self.student)
+        with mock.patch('main.pdf.render_pdf') as render_pdf:
+            names, manifest = self.read_archive(self.client.get('/api/applications/pdf-archive/'))
+
+        render_pdf.assert_not_called()
+        self.assertEqual(names, ['manifest.csv'])
+        self.assertIn('not_generated,PDF is missing.', manifest)
+
+    def test_archive_keeps_pdfs_that_are_out_of_date(self):
+        ensure_application_pdf(self.application)
+        self.application.description = 'С места работы'
+        self.application.save(update_fields=['description'])
+
+        self.client.force_login(self.student)
+        names, manifest = self.read_archive(self.client.get('/api/applications/pdf-archive/'))
+        self.assertEqual(len(names), 2)
+        self.assertIn(f'application_{self.application.id}.pdf,stale,', manifest)
+
+    def test_admin_action_exports_the_selected_applications(self):
+        ensure_application_pdf(self.application)
+        other = Application.objects.create(student=self.student, title='Перевод', description='На другую группу')
+        self.client.force_login(User.objects.create_superuser(username='admin'))
+        response = self.client.post('/admin/main/application/', {
+            'action': 'export_pdf_archive', '_selected_action': [self.application.id, other.id]})
+
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        names, manifest = self.read_archive(response)
+        self.assertEqual(len(names), 2)
+        self.assertEqual(len(manifest.splitlines()), 3)
+
+    def test_other_students_are_forbidden(self):
+        self.client.force_login(User.objects.create_user(username='other'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class ApplicationCounterTests(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user(username='student')
+
+    def counts(self):
+        return dict(ApplicationCounter.objects.filter(dimension='status', count__gt=0).values_list('key', 'count'))
+
+    def test_counters_follow_saves_and_deletes(self):
+        first = Application.objects.create(student=self.student, title='a', description='a', status='in_progress')
+        Application.objects.create(student=self.student, title='b', description='b', status='in_progress')
+        self.assertEqual(self.counts(), {'in_progress': 2})
+
+        first = Application.objects.get(pk=first.pk)
+        first.status = 'done'
+        first.save()
+        self.assertEqual(self.counts(), {'in_progress': 1, 'done': 1})
+
+        first.delete()
+        self.assertEqual(self.counts(), {'in_progress': 1})
+        self.assertEqual(reconcile_counters(), {})
+
+    def test_reconcile_fixes_updates_that_bypass_signals(self):
+        Application.objects.create(student=self.student, title='a', description='a', status='in_progress')
+        Application.objects.update(status='done')
+
+        self.assertEqual(reconcile_counters(), {'status=in_progress': 1, 'status=done': -1})
+        self.assertEqual(self.counts(), {'done': 1})
+
+    def test_reconcile_reads_the_counters_before_counting(self):
+        Application.objects.create(student=self.student, title='a', description='a', status='in_progress')
+        with CaptureQueriesContext(connection) as queries:
+            reconcile_counters()
+
+        tables = [query['sql'].split(' FROM ')[1].split()[0] for query in queries if query['sql'].startswith('SELECT')]
+        self.assertEqual(tables[0], '"main_applicationcounter"')
+        self.assertEqual(set(tables[1:]), {'"main_application"'})
+
+
+class ApplicationListTests(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user(username='student')
+        other = User.objects.create_user(username='other')
+        for index in range(3):
+            Application.objects.create(student=self.student, title=f'a{index}', description='', status='in_progress')
+        Application.objects.create(student=other, title='b', description='', status='done')
+
+    def test_filters_and_cursor_pages(self):
+        response = self.client.get(f'/api/applications/?student={self.student.id}&page_size=2')
+        page = response.json()
+        self.assertEqual([item['title'] for item in page['results']], ['a2', 'a1'])
+
+        next_page = self.client.get(page['next']).json()
+        self.assertEqual([item['title'] for item in next_page['results']], ['a0'])
+        self.assertIsNone(next_page['next'])
+
+    def test_cursor_keeps_its_place_among_equal_timestamps(self):
+        Application.objects.update(created_at=Application.objects.first().created_at)
+        first = self.client.get('/api/applications/?page_size=2').json()
+        self.assertEqual([item['title'] for item in first['results']], ['b', 'a2'])
+
+        # A row before the cursor disappears: the next page still starts right after "a2".
+        Application.objects.get(title='b').delete()
+        second = self.client.get(first['next']).json()
+        self.assertEqual([item['title'] for item in second['results']], ['a1', 'a0'])
+        self.assertIsNone(second['next'])
+
+        back = self.client.get(second['previous']).json()
+        self.assertEqual([item['title'] for item in back['results']], ['a2'])
+
+    def test_status_and_date_filters(self):
+        self.assertEqual(len(self.client.get('/api/applications/?status=done').json()['results']), 1)
+        self.assertEqual(self.client.get('/api/applications/?from=2024-13-01').status_code, 400)
+
+
+class BulkStatusTests(TestCase):
+    def setUp(self):
+        student = User.objects.create_user(username='student')
+        self.open = Application.objects.create(student=student, title='a', description='', status='in_progress')
+        self.closed = Application.objects.create(student=student, title='b', description='', status='completed')
+        self.client.force_login(User.objects.create_user(username='staff', is_staff=True))
+
+    def test_applies_allowed_transitions_only(self):
+        response = self.client.post('/api/applications/bulk-status/',
+                                    {'ids': [self.open.id, self.closed.id, 999], 'status': 'done'},
+                                    content_type='application/json')
+
+        self.assertEqual(response.json()['updated'], [self.open.id])
+        self.assertEqual(list(response.json()['rejected']), [str(self.closed.id)])
+        self.assertEqual(response.json()['not_found'], [999])
+        self.open.refresh_from_db()
+        self.assertEqual(self.open.status, 'done')
+        self.assertEqual(reconcile_counters(), {})
+
+    def test_students_cannot_change_statuses(self):
+        self.client.force_login(self.open.student)
+        response = self.client.post('/api/applications/bulk-status/', {'ids': [self.open.id], 'status': 'done'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+
+
+class ApplicationSearchTests(TestCase):
+    def setUp(self):
+        student = User.objects.create_user(username='student')
+        self.transfer = Application.objects.create(
+            student=student, title='Заявление на перевод', description='Прошу перевести на другую специальность')
+        self.leave = Application.objects.create(
+            student=student, title='Академический отпуск', description='По состоянию здоровья, перевод позже')
+        Application.objects.create(student=student, title='Справка', description='С места учёбы')
+
+    def test_ranks_prefix_matches(self):
+        found = search_applications(Application.objects.all(), 'перев')
+        self.assertEqual(list(found), [self.transfer, self.leave])
+        self.assertFalse(search_applications(Application.objects.all(), '"*)').exists())
+
+    def test_index_follows_updates_and_deletes(self):
+        self.leave.title = 'Справка о переводе'
+        self.leave.save()
+        self.assertEqual(list(search_applications(Application.objects.all(), 'справка о')), [self.leave])
+        self.leave.delete()
+        self.assertEqual(list(search_applications(Application.objects.all(), 'перевод')), [self.transfer])
+
+    def test_api_search(self):
+        response = self.client.get('/api/applications/?q=отпуск')
+        self.assertEqual([item['id'] for item in response.json()['results']], [self.leave.id])
+
+    def test_api_search_pages_by_relevance(self):
+        first = self.client.get('/api/applications/', {'q': 'перев', 'limit': 1}).json()
+        self.assertEqual(first['count'], 2)
+        self.assertEqual([item['id'] for item in first['results']], [self.transfer.id])
+
+        second = self.client.get(first['next']).json()
+        self.assertEqual([item['id'] for item in second['results']], [self.leave.id])
+        self.assertIsNone(second['next'])
+
+    def test_joins_the_index_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            list(search_applications(Application.objects.all(), 'перевод'))
+        self.assertEqual(queries[0]['sql'].count('main_application_fts MATCH'), 1)
+
+    def test_admin_search(self):
+        self.client.force_login(User.objects.create_superuser(username='admin'))
+
+        def found(**params):
+            response = self.client.get('/admin/main/application/', params)
+            return list(response.context['cl'].result_list)
+
+        self.assertEqual(found(q='перев'), [self.transfer, self.leave])
+        # The column picked in the list wins over relevance (2 is "title").
+        self.assertEqual(found(q='перев', o='2'), [self.leave, self.transfer])
+        self.transfer.status = 'done'
+        self.transfer.save()
+        self.assertEqual(found(q='исполн'), [self.transfer])
+
+
+class PaginationTests(TestCase):
+    def test_reference_tables_use_limit_offset_with_a_cap(self):
+        Faculty.objects.bulk_create([Faculty(name=f'f{index}') for index in range(MAX_PAGE_SIZE + 5)])
+
+        page = self.client.get('/api/faculties/?limit=2&offset=1').json()
+        self.assertEqual(page['count'], MAX_PAGE_SIZE + 5)
+        self.assertEqual([item['name'] for item in page['results']], ['f1', 'f2'])
+        self.assertEqual(len(self.client.get('/api/faculties/?limit=1000').json()['results']), MAX_PAGE_SIZE)
+
+    def test_large_tables_use_cursors(self):
+        page = self.client.get('/api/grades/').json()
+        self.assertEqual((page['next'], page['results']), (None, []))
+
+
+class GradeDataTestCase(TestCase):
+    def setUp(self):
+        faculty = Faculty.objects.create(name='IT')
+        speciality = Speciality.objects.create(name='Software Engineering')
+        status = StudentStatus.objects.create(name='Active')
+        subject = Subject.objects.create(name='Algorithms')
+        grade_type = TypeOfGrades.objects.create(title='Exam')
+        teacher = Teacher.objects.create(first_name='A', last_name='B')
+        for index in range(3):
+            student = Student.objects.create(
+                first_name='S', middle_name='', last_name=str(index), date_of_birth='2000-01-01',
+                email='s@example.com', phone='', speciality=speciality, status=status, current_faculty=faculty)
+            Grade.objects.create(id=index + 1, student=student, subject=subject, faculty=faculty,
+                                 speciality=speciality, grade_type=grade_type, grade=90, teacher=teacher,
+                                 date='2024-01-01T10:00:00Z')
+
+
+class ExpandTests(GradeDataTestCase):
+    def test_expanded_list_uses_a_constant_number_of_queries(self):
+        with self.assertNumQueries(2):
+            # Grades joined with the expanded relations, faculties of the nested students.
+            response = self.client.get('/api/grades/?expand=subject,student,grade_type')
+        grade = response.json()['results'][0]
+        self.assertEqual(grade['subject']['name'], 'Algorithms')
+        self.assertEqual(grade['student']['last_name'], '2')
+        self.assertIsInstance(grade['teacher'], int)
+
+        with self.assertNumQueries(3):
+            # Paginator count, students with their foreign keys, prefetched faculties.
+            students = self.client.get('/api/students/?expand=speciality,faculties').json()['results']
+        self.assertEqual(students[0]['speciality']['name'], 'Software Engineering')
+        self.assertEqual(students[0]['faculties'], [])
+
+    def test_unknown_relation(self):
+        self.assertEqual(self.client.get('/api/grades/?expand=password').status_code, 400)
+
+
+class SparseFieldsetTests(GradeDataTestCase):
+    def test_fields_and_omit(self):
+        with CaptureQueriesContext(connection) as queries:
+            students = self.client.get('/api/students/?fields=id,last_name').json()['results']
+        self.assertEqual(set(students[0]), {'id', 'last_name'})
+        self.assertNotIn('email', queries[-1]['sql'])
+
+        grade = self.client.get('/api/grades/?omit=date,teacher&expand=subject').json()['results'][0]
+        self.assertNotIn('date', grade)
+        self.assertEqual(grade['subject']['name'], 'Algorithms')
+        self.assertEqual(self.client.get('/api/grades/?fields=nope').status_code, 400)
+
+    def test_cursor_still_pages(self):
+        page = self.client.get('/api/grades/?fields=grade&page_size=2').json()
+        self.assertEqual(page['results'], [{'grade': 90}, {'grade': 90}])
+        self.assertEqual(len(self.client.get(page['next']).json()['results']), 1)
+
+
+class ReferenceCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.faculty = Faculty.objects.create(name='IT')
+
+    def test_etag_revalidation_skips_the_database(self):
+        response = self.client.get('/api/faculties/')
+        etag = response['ETag']
+        self.assertEqual(response.json()['results'][0]['name'], 'IT')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/faculties/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.assertEqual(self.client.get('/api/faculties/').json()['results'][0]['name'], 'IT')
+
+        self.faculty.name = 'Information Technology'
+        self.faculty.save()
+        response = self.client.get('/api/faculties/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['results'][0]['name'], 'Information Technology')
+
+    def test_version_is_shared_between_processes(self):
+        # Tests run on an in-memory cache; this one checks the file cache the server uses.
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        self.enterContext(override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}))
+
+        # A separate backend instance reads the cache the way another server process does.
+        other_process = caches.create_connection('default')
+        version = reference_version()
+        self.assertTrue(os.listdir(location))
+        self.assertEqual(other_process.get(VERSION_KEY), version)
+
+        Faculty.objects.create(name='Law')
+        self.assertNotEqual(other_process.get(VERSION_KEY), version)
+
+    def test_bundle(self):
+        bundle = self.client.get('/api/reference/').json()
+        self.assertEqual(bundle['faculties'][0]['name'], 'IT')
+        self.assertEqual(len(bundle['type-of-grades']), TypeOfGrades.objects.count())
+
+
+class BulkGradeTests(GradeDataTestCase):
+    def setUp(self):
+        super().setUp()
+        self.grade = Grade.objects.get(id=1)
+        self.student = Student.objects.create(
+            first_name='N', middle_name='', last_name='New', date_of_birth='2000-01-01', email='n@example.com',
+            phone='', speciality=self.grade.speciality, status=self.grade.student.status,
+            current_faculty=self.grade.faculty)
+        self.client.force_login(User.objects.create_user(username='staff', is_staff=True))
+
+    def row(self, **values):
+        return {'student': self.grade.student_id, 'subject': self.grade.subject_id,
+                'grade_type': self.grade.grade_type_id, 'teacher': self.grade.teacher_id, 'grade': 75, **values}
+
+    def test_upserts_by_student_subject_and_type(self):
+        rows = [self.row(), self.row(student=self.student.id, date='2024-05-01')]
+        # Session and user, then the rows.
+        with self.assertNumQueries(10):
+            response = self.client.post('/api/grades/bulk/', rows, content_type='application/json')
+
+        self.assertEqual(response.json(), {'created': 1, 'updated': 1, 'errors': {}})
+        self.grade.refresh_from_db()
+        self.assertEqual(self.grade.grade, 75)
+        created = Grade.objects.get(student=self.student)
+        self.assertEqual(created.faculty_id, self.student.current_faculty_id)
+
+    def test_reports_errors_per_row_and_saves_nothing(self):
+        rows = [self.row(student=self.student.id), self.row(grade=101, teacher=999), self.row(subject='x')]
+        response = self.client.post('/api/grades/bulk/', rows, content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()['errors']), {'1', '2'})
+        self.assertEqual(set(response.json()['errors']['1']), {'grade', 'teacher'})
+        self.assertFalse(Grade.objects.filter(student=self.student).exists())
+
+    def test_only_staff_can_upload(self):
+        self.client.logout()
+        self.assertEqual(self.client.post('/api/grades/bulk/', [self.row()], content_type='application/json').status_code, 403)
+        self.client.force_login(User.objects.create_user(username='student'))
+        self.assertEqual(self.client.post('/api/grades/bulk/', [self.row()], content_type='application/json').status_code, 403)
+        self.grade.refresh_from_db()
+        self.assertNotEqual(self.grade.grade, 75)
+
+
+class ScheduleImportTests(TestCase):
+    sheet = 'SE,DS+НИШ 2кАО'
+
+    def run_import(self, source, **options):
+        return ScheduleImport(file=TIMETABLE, source=source, sheet_names=[self.sheet], max_workers=1, **options).run()
+
+    def test_unchanged_sheets_are_skipped(self):
+        first = self.run_import('fall')
+        rows = Schedule.objects.count()
+        self.assertEqual(first.summary['inserted'], rows)
+        self.assertEqual(ScheduleSheet.objects.get(sheet_name=self.sheet).version, first)
+
+        self.assertIsNone(self.run_import('fall'))
+        forced = self.run_import('fall', force=True)
+        self.assertEqual((forced.summary['inserted'], forced.summary['deleted']), (0, 0))
+        self.assertEqual(Schedule.objects.count(), rows)
+
+    def test_changed_sheet_only_gets_the_difference(self):
+        schedule = load_workbook_schedules(TIMETABLE, sheet_names=[self.sheet], max_workers=1)[self.sheet]
+        self.run_import('fall')
+        ids = set(Schedule.objects.values_list('id', flat=True))
+
+        changed = [dict(entry) for entry in schedule]
+        changed[0]['Room'] = 'а999'
+        self.assertEqual(sheet_fingerprint(schedule), sheet_fingerprint([dict(entry) for entry in schedule]))
+        self.assertNotEqual(sheet_fingerprint(changed), sheet_fingerprint(schedule))
+
+        with mock.patch('main.schedule_import.load_workbook_schedules', return_value={self.sheet: changed}):
+            version = self.run_import('fall')
+
+        self.assertEqual(version.summary['sheets'][self.sheet], {'inserted': 1, 'deleted': 1})
+        self.assertEqual(len(ids & set(Schedule.objects.values_list('id', flat=True))), len(ids) - 1)
+        self.assertEqual(Schedule.objects.get(room='а999').version, version)
+
+    def test_superseded_versions_keep_their_carried_over_rows(self):
+        schedule = load_workbook_schedules(TIMETABLE, sheet_names=[self.sheet], max_workers=1)[self.sheet]
+        first = self.run_import('fall')
+        changed = [dict(entry) for entry in schedule]
+        changed[0]['Room'] = 'а999'
+        with mock.patch('main.schedule_import.load_workbook_schedules', return_value={self.sheet: changed}):
+            self.run_import('fall')
+        rows = Schedule.objects.count()
+
+        with self.assertRaises(ProtectedError):
+            first.delete()
+        self.assertEqual(Schedule.objects.count(), rows)
+        self.assertEqual(len(stored_schedule('fall', self.sheet)), rows)
+
+    def test_imported_schedules_are_served_without_the_workbook(self):
+        self.run_import('fall')
+        registry = TimetableRegistry([TimetableSource('fall', os.path.join(tempfile.gettempdir(), 'missing.xlsx'))])
+        self.client.force_login(User.objects.create_user(username='student'))
+
+        with mock.patch('main.views.get_registry', return_value=registry):
+            response = self.client.post('/view_schedule/', {'speciality': self.sheet})
+            self.assertTemplateUsed(response, 'schedule.html')
+            self.assertEqual(response.context['schedule'], stored_schedule('fall', self.sheet))
+
+            response = self.client.post('/view_schedule/', {'speciality': 'МОиЭ2кРО'})
+            self.assertTemplateUsed(response, 'select_speciality.html')
+            self.assertIn('not found', str(list(response.context['messages'])[0]))
+
+    def test_clashes_are_looked_for_within_one_source(self):
+        def clashes(*args):
+            stdout = io.StringIO()
+            registry = TimetableRegistry([TimetableSource(key, TIMETABLE) for key in ('fall', 'spring')])
+            with mock.patch('main.management.commands.timetable_clashes.get_registry', return_value=registry):
+                call_command('timetable_clashes', *args, stdout=stdout)
+            return stdout.getvalue().splitlines()[-1]
+
+        self.run_import('fall')
+        before = clashes('--source=fall')
+        spring = self.run_import('spring')
+        # Same teachers at the same times in other rooms: a clash on every lesson, were the sources mixed.
+        Schedule.objects.filter(source='spring').update(room='101')
+        mixed = ScheduleIntervals(stored_slots('fall') + stored_slots('spring'))
+        self.assertGreater(len(mixed.clashes('teacher')), len(ScheduleIntervals(stored_slots('fall')).clashes('teacher')))
+
+        self.assertEqual(len(stored_slots('fall')), Schedule.objects.filter(source='fall').count())
+        self.assertEqual(clashes('--source=fall'), before)
+        self.assertEqual(clashes(f'--schedule-version={spring.pk}'), before)
+        with self.assertRaisesMessage(CommandError, 'not "fall"'):
+            clashes('--source=fall', f'--schedule-version={spring.pk}')
+
+    def test_new_reference_rows_invalidate_the_reference_cache(self):
+        cache.clear()
+        self.assertEqual(self.client.get('/api/subjects/').json()['count'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_import('fall')
+
+        self.assertEqual(self.client.get('/api/subjects/').json()['count'], Subject.objects.count())
+        self.assertTrue(Subject.objects.exists())
+
+    def test_sources_with_the_same_sheet_are_kept_apart(self):
+        self.run_import('fall')
+        fall = stored_schedule('fall', self.sheet)
+        Schedule.objects.filter(source='fall').update(room='101')
+
+        self.assertIsNotNone(self.run_import('spring'))
+        self.assertEqual(ScheduleSheet.objects.filter(sheet_name=self.sheet).count(), 2)
+        self.assertEqual(stored_schedule('spring', self.sheet), fall)
+        self.assertEqual({entry['Room'] for entry in stored_schedule('fall', self.sheet)}, {'101'})
+        self.assertIsNone(stored_schedule('winter', self.sheet))
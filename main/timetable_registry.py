@@ -0,0 +1,170 @@
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass
+from os import environ
+from os.path import isabs, join
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from openpyxl import load_workbook
+
+from .schedule_cache import TimetableSnapshot, TimetableWatcher, workbook_stamp
+
+
+@dataclass(frozen=True)
+class TimetableSource:
+    """
+    One timetable workbook: a semester of one campus.
+    """
+
+    key: str
+    file: str
+    semester: str = ''
+    campus: str = ''
+
+
+def discover_sheet_names(file: str) -> List[str]:
+    """
+    Lists the sheets of a workbook without parsing them: read-only mode only reads the workbook index.
+    """
+    workbook = load_workbook(file, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+class TimetableRegistry:
+    """
+    Every configured timetable source, loaded on first use.
+
+    Each source has its own TimetableWatcher. Parsed workbooks are kept in least recently used
+    order, and once their estimated size goes over "memory_budget" bytes the least recently used
+    ones are dropped and parsed again the next time they are needed. The workbook in use is never
+    dropped, even if it alone is over the budget.
+
+    Example usage:
+    registry = TimetableRegistry([TimetableSource("2024-fall", "timetable.xlsx")])
+    source, sheet_name = registry.find_sheet("ИС 2кко")
+    registry.snapshot(source.key).sheet(sheet_name)
+    """
+
+    def __init__(self, sources: Iterable[TimetableSource], memory_budget: int = 256 * 1024 * 1024,
+                 watch_interval: float = 5):
+        self.sources: Dict[str, TimetableSource] = {source.key: source for source in sources}
+        if not self.sources:
+            raise ValueError('At least one timetable source is required.')
+
+        self.memory_budget = memory_budget
+        self.evictions = 0
+        self._watchers = {
+            key: TimetableWatcher(source.file, interval=watch_interval) for key, source in self.sources.items()
+        }
+        self._loaded: 'OrderedDict[str, int]' = OrderedDict()
+        self._sheet_names: Dict[str, Tuple[Tuple[int, int], List[str]]] = {}
+        self._lock = Lock()
+
+    def source(self, key: Optional[str] = None) -> TimetableSource:
+        """
+        Returns the source with this key, or the first configured source if no key is given.
+        """
+        if key is None:
+            return next(iter(self.sources.values()))
+        if key not in self.sources:
+            raise ValueError(f'Timetable source "{key}" not found.')
+        return self.sources[key]
+
+    def sheet_names(self, key: Optional[str] = None) -> List[str]:
+        source = self.source(key)
+        stamp = workbook_stamp(source.file)
+        cached = self._sheet_names.get(source.key)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, discover_sheet_names(source.file))
+            self._sheet_names[source.key] = cached
+        return cached[1]
+
+    def find_sheet(self, speciality_name: str, key: Optional[str] = None) -> Optional[Tuple[TimetableSource, str]]:
+        """
+        Finds the sheet of a speciality, ignoring the stray spaces around sheet names.
+        Without a key every source is searched in the configured order.
+        """
+        keys = [self.source(key).key] if key is not None else list(self.sources)
+        for source_key in keys:
+            for sheet_name in self.sheet_names(source_key):
+                if sheet_name.strip() == speciality_name.strip():
+                    return self.sources[source_key], sheet_name
+        return None
+
+    def snapshot(self, key: Optional[str] = None) -> TimetableSnapshot:
+        source = self.source(key)
+        snapshot = self._watchers[source.key].snapshot()
+
+        with self._lock:
+            self._loaded[source.key] = snapshot.size
+            self._loaded.move_to_end(source.key)
+            while sum(self._loaded.values()) > self.memory_budget and len(self._loaded) > 1:
+                evicted, _ = self._loaded.popitem(last=False)
+                self._watchers[evicted].clear()
+                self.evictions += 1
+
+        return snapshot
+
+    def start(self) -> None:
+        for watcher in self._watchers.values():
+            watcher.start()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'memory_budget': self.memory_budget,
+            'memory_used': sum(self._loaded.values()),
+            'evictions': self.evictions,
+            'sources': {key: watcher.stats() for key, watcher in self._watchers.items()},
+        }
+
+
+def configured_sources() -> List[TimetableSource]:
+    """
+    Sources from the TIMETABLE_SOURCES setting; without it, the single TIMETABLE_FILE workbook.
+    """
+    sources = getattr(settings, 'TIMETABLE_SOURCES', None) or [{'key': 'default', 'file': settings.TIMETABLE_FILE}]
+    return [
+        TimetableSource(**{**source, 'file': source['file'] if isabs(source['file'])
+                           else join(settings.BASE_DIR, source['file'])})
+        for source in sources
+    ]
+
+
+_registry: Optional[TimetableRegistry] = None
+_registry_lock = Lock()
+
+
+def get_registry() -> TimetableRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = TimetableRegistry(
+                    configured_sources(),
+                    memory_budget=getattr(settings, 'TIMETABLE_MEMORY_BUDGET', 256 * 1024 * 1024),
+                    watch_interval=getattr(settings, 'TIMETABLE_WATCH_INTERVAL', 5),
+                )
+    return _registry
+
+
+def should_watch() -> bool:
+    """
+    The watchers are opt-in (TIMETABLE_WATCH), meant for the processes serving requests. Even then
+    they don't run in management commands other than runserver, nor in its autoreloader parent.
+    Without them the snapshots are still refreshed, by the first request after a change.
+    """
+    if not getattr(settings, 'TIMETABLE_WATCH', False) or not getattr(settings, 'TIMETABLE_WATCH_INTERVAL', 5):
+        return False
+    if sys.argv[0].endswith('manage.py') and len(sys.argv) > 1:
+        return sys.argv[1] == 'runserver' and environ.get('RUN_MAIN') == 'true'
+    return True
+
+
+def start_watchers() -> None:
+    if should_watch():
+        get_registry().start()
@@ -47,6 +47,13 @@ urlpatterns = [
     path('login/', user_login, name='login'),
     path('api/register/', api_register, name='api_register'),
     path('view_schedule/', views.view_schedule, name='view_schedule'),
+    path('api/reference/', views.reference_data, name='reference_data'),
+    path('api/timetable/sources/', views.timetable_sources, name='timetable_sources'),
+    path('api/timetable/free-rooms/', views.timetable_free_rooms, name='timetable_free_rooms'),
+    path('api/timetable/clashes/', views.timetable_clashes, name='timetable_clashes'),
+    path('api/timetable/teacher/<str:name>/', views.timetable_teacher, name='timetable_teacher'),
+    path('api/timetable/room/<path:room>/', views.timetable_room, name='timetable_room'),
+    path('api/timetable/subject/<str:name>/', views.timetable_subject, name='timetable_subject'),
 ] 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -1,17 +1,17 @@
 from django.shortcuts import render, redirect
 from main.models import DayOfWeek, Language
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import action, api_view
 from django.contrib.auth import authenticate, login
 from .forms import StudentRegistrationForm, LoginForm
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from rest_framework.response import Response
-from django.db.models import Count
 from .models import (Student, Faculty, StudentOfFaculty, Speciality, Teacher, Subject, 
                      Language, StudentStatus, News, Notification, Application, 
                      ApplicationStatus, StudentOfLanguage, StudentOfSpeciality, 
-                     TypeOfGrades, Grade, DayOfWeek, ScheduleVersion, Schedule, User, ApplicationInformation, Category, Executor, Responsible)
+                     TypeOfGrades, Grade, DayOfWeek, ScheduleVersion, Schedule, User, ApplicationInformation, Category, Executor, Responsible,
+                     ApplicationCounter)
 from .serializers import (FacultySerializer, SpecialitySerializer, TeacherSerializer, 
                           SubjectSerializer, LanguageSerializer, StudentStatusSerializer, 
                           NewsSerializer, NotificationSerializer, ApplicationSerializer, 
@@ -20,12 +20,30 @@ from .serializers import (FacultySerializer, SpecialitySerializer, TeacherSerial
                           StudentOfSpecialitySerializer, StudentOfLanguageSerializer, 
                           DayOfWeekSerializer, ScheduleVersionSerializer, ScheduleSerializer,
                           ApplicationInformationSerializer, ExecutorSerializer, ResponsibleSerializer, CategorySerializer)
+from rest_framework.exceptions import NotFound, PermissionDenied
+from django.conf import settings
+import os
+from django.core.cache import cache
+from .application_status import change_status
+from .counters import application_stats
+from .downloads import file_response, not_modified_response, zip_response
+from .expand import ExpandQuerysetMixin
+from .fieldsets import SparseQuerysetMixin
+from .filters import ApplicationFilterBackend
+from .grades import save_grades
+from .pagination import ApplicationCursorPagination, ApplicationSearchPagination, LargeTableCursorPagination
+from .pdf import application_archive_entries, ensure_application_pdf
+from .reference import ReferenceCacheMixin, cached_reference_response, reference_bundle
+from .schedule_import import stored_schedule
+from .schedule_query import parse_day
+from .timetable_registry import get_registry
 
 
 
 def application_status_count():
-    counts = Application.objects.values('status').annotate(count=Count('id'))
-    return {item['status']: item['count'] for item in counts}
+    # Counts come from the counter table kept up to date by signals, not from a GROUP BY.
+    counters = ApplicationCounter.objects.filter(dimension='status', count__gt=0)
+    return {counter.key: counter.count for counter in counters}
 
 
 
@@ -108,120 +126,281 @@ def user_settings(request):
 @login_required
 def view_schedule(request):
     if request.method == 'POST':
-        speciality_name = request.POST.get('speciality')
-        sheet_name = SPECIALITY_SHEET_MAP.get(speciality_name)
+        speciality_name = request.POST.get('speciality', '')
+        registry = get_registry()
 
-        if sheet_name:
-            try:
-                scraper = ScheduleScraper(
-                    file="timetable.xlsx", sheet_name=sheet_name)
-                schedule = scraper.__post_init__()  # Get the schedule JSON
+        try:
+            source_key = request.POST.get('source') or None
+            keys = [registry.source(source_key).key] if source_key is not None else list(registry.sources)
+            # Imported timetables are read from the database, the workbook is not even opened.
+            for key in keys:
+                schedule = stored_schedule(key, speciality_name)
+                if schedule is not None:
+                    return render(request, 'schedule.html',
+                                  {'schedule': schedule, 'speciality': speciality_name.strip()})
+
+            # Specialities that were never imported fall back to the parsed (and cached) Excel sheet.
+            found = registry.find_sheet(speciality_name, source_key)
+            if found:
+                source, sheet_name = found
+                schedule = registry.snapshot(source.key).sheet(sheet_name)
                 return render(request, 'schedule.html', {'schedule': schedule, 'speciality': sheet_name})
-            except Exception as e:
-                print(e)
-                messages.error(request, str(e))
-        else:
+
             print(f'Sheet name for speciality "{speciality_name}" not found')
             messages.error(request, 'Speciality not found.')
+        except Exception as e:
+            print(e)
+            messages.error(request, str(e))
 
     # Render the selection form if not a POST request
     specialties = Speciality.objects.filter(is_active=True)  # Fetch active specialties
     return render(request, 'select_speciality.html', {'specialities': specialties})
 
 
-class FacultyViewSet(viewsets.ModelViewSet):
+def _timetable_snapshot(request):
+    try:
+        return get_registry().snapshot(request.query_params.get('source'))
+    except ValueError as e:
+        raise NotFound(str(e)) from e
+
+
+def _timetable_slots_response(kind, value, slots):
+    if not slots:
+        return Response({'detail': f'No lessons found for {kind} "{value}".'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({kind: value, 'count': len(slots), 'slots': slots})
+
+
+@api_view(['GET'])
+def timetable_teacher(request, name):
+    return _timetable_slots_response('teacher', name, _timetable_snapshot(request).index.teacher(name))
+
+
+@api_view(['GET'])
+def timetable_room(request, room):
+    return _timetable_slots_response('room', room, _timetable_snapshot(request).index.room(room))
+
+
+@api_view(['GET'])
+def timetable_subject(request, name):
+    return _timetable_slots_response('subject', name, _timetable_snapshot(request).index.subject(name))
+
+
+@api_view(['GET'])
+def timetable_free_rooms(request):
+    day = request.query_params.get('day')
+    start = request.query_params.get('start')
+    end = request.query_params.get('end')
+    if not (day and start and end):
+        return Response({'detail': 'Query parameters "day", "start" and "end" are required.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        # Checked before the timetable is loaded, so a typo doesn't cost a workbook parse.
+        day = parse_day(day)
+        rooms = _timetable_snapshot(request).intervals.free_rooms(day, start, end)
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'day': day, 'start': start, 'end': end, 'count': len(rooms), 'rooms': rooms})
+
+
+@api_view(['GET'])
+def timetable_clashes(request):
+    kind = request.query_params.get('kind', 'teacher')
+    try:
+        intervals = _timetable_snapshot(request).intervals
+        clashes = intervals.clashes(kind, request.query_params.get('day'))
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'kind': kind, 'count': len(clashes), 'clashes': clashes})
+
+
+@api_view(['GET'])
+def timetable_sources(request):
+    registry = get_registry()
+    sources = []
+    for source in registry.sources.values():
+        try:
+            sheets = [name.strip() for name in registry.sheet_names(source.key)]
+        except FileNotFoundError:
+            sheets = []
+        sources.append({'key': source.key, 'semester': source.semester, 'campus': source.campus,
+                        'sheets': sheets})
+    return Response({'count': len(sources), 'sources': sources})
+
+
+@api_view(['GET'])
+def reference_data(request):
+    # All reference tables in one response, for the mobile app start-up.
+    return cached_reference_response(request, lambda: Response(reference_bundle()))
+
+
+class FacultyViewSet(ReferenceCacheMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = Faculty.objects.all()
     serializer_class = FacultySerializer
 
-class SpecialityViewSet(viewsets.ModelViewSet):
+class SpecialityViewSet(ReferenceCacheMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = Speciality.objects.all()
     serializer_class = SpecialitySerializer
 
-class TeacherViewSet(viewsets.ModelViewSet):
+class TeacherViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = Teacher.objects.all()
     serializer_class = TeacherSerializer
 
-class SubjectViewSet(viewsets.ModelViewSet):
+class SubjectViewSet(ReferenceCacheMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
 
-class LanguageViewSet(viewsets.ModelViewSet):
+class LanguageViewSet(ReferenceCacheMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = Language.objects.all()
     serializer_class = LanguageSerializer
 
-class StudentStatusViewSet(viewsets.ModelViewSet):
+class StudentStatusViewSet(ReferenceCacheMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = StudentStatus.objects.all()
     serializer_class = StudentStatusSerializer
 
-class NewsViewSet(viewsets.ModelViewSet):
+class NewsViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = News.objects.all()
     serializer_class = NewsSerializer
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
 
-class ApplicationViewSet(viewsets.ModelViewSet):
+class ApplicationViewSet(SparseQuerysetMixin, ExpandQuerysetMixin, viewsets.ModelViewSet):
     queryset = Application.objects.all()
     serializer_class = ApplicationSerializer
+    filter_backends = [ApplicationFilterBackend]
+    pagination_class = ApplicationCursorPagination
+
+    @property
+    def paginator(self):
+        # Search results are ordered by relevance, which the (created_at, id) cursor can't page through.
+        if not hasattr(self, '_paginator') and self.request is not None and self.request.query_params.get('q'):
+            self._paginator = ApplicationSearchPagination()
+        return super().paginator
+
+    @action(detail=True, methods=['get'])
+    def pdf(self, request, pk=None):
+        application = self.get_object()
+        if not (request.user.is_staff or application.student_id == request.user.id):
+            raise PermissionDenied('Only the student who submitted the application can download it.')
+
+        # A "ready" PDF is the one pdf_hash describes: a client that has it needs no render or file read.
+        if application.pdf_status == 'ready' and application.pdf_hash:
+            response = not_modified_response(request, application.pdf_hash)
+            if response is not None:
+                return response
 
-
-class ApplicationInformationViewSet(viewsets.ModelViewSet):
+        try:
+            result = ensure_application_pdf(application)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return file_response(request, os.path.join(settings.MEDIA_ROOT, result['name']), result['hash'],
+                             f'application_{application.id}.pdf', 'application/pdf')
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        if not request.user.is_staff:
+            raise PermissionDenied('Only staff can see application statistics.')
+        # Polled every few seconds by the dashboard: a few seconds of staleness are fine.
+        timeout = getattr(settings, 'APPLICATION_STATS_CACHE_SECONDS', 5)
+        return Response(cache.get_or_set('application_stats', application_stats, timeout))
+
+    @action(detail=False, methods=['post'], url_path='bulk-status')
+    def bulk_status(self, request):
+        if not request.user.is_staff:
+            raise PermissionDenied('Only staff can change application statuses.')
+
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not ids or not all(isinstance(value, int) for value in ids):
+            return Response({'detail': '"ids" must be a non-empty list of application ids.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            result = change_status(ids, request.data.get('status'))
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+
+    @action(detail=False, methods=['get'], url_path='pdf-archive')
+    def pdf_archive(self, request):
+        # Staff get every application, students only their own.
+        if not request.user.is_authenticated:
+            raise PermissionDenied('Log in to download applications.')
+        queryset = self.filter_queryset(self.get_queryset())
+        if not request.user.is_staff:
+            queryset = queryset.filter(student_id=request.user.id)
+        return zip_response(application_archive_entries(queryset.order_by('id')), 'applications.zip')
+
+
+class ApplicationInformationViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = ApplicationInformation.objects.all()
     serializer_class = ApplicationInformationSerializer
     
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ReferenceCacheMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     
 
-class ExecutorViewSet(viewsets.ModelViewSet):
+class ExecutorViewSet(ReferenceCacheMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = Executor.objects.all()
     serializer_class = ExecutorSerializer
     
 
-class ResponsibleViewSet(viewsets.ModelViewSet):
+class ResponsibleViewSet(ReferenceCacheMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = Responsible.objects.all()
     serializer_class = ResponsibleSerializer
     
 
-class ApplicationStatusViewSet(viewsets.ModelViewSet):
+class ApplicationStatusViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = ApplicationStatus.objects.all()
     serializer_class = ApplicationStatusSerializer
 
-class TypeOfGradesViewSet(viewsets.ModelViewSet):
+class TypeOfGradesViewSet(ReferenceCacheMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = TypeOfGrades.objects.all()
     serializer_class = TypeOfGradesSerializer
 
-class StudentViewSet(viewsets.ModelViewSet):
+class StudentViewSet(SparseQuerysetMixin, ExpandQuerysetMixin, viewsets.ModelViewSet):
     queryset = Student.objects.all()
     serializer_class = StudentSerializer
 
-class GradeViewSet(viewsets.ModelViewSet):
+class GradeViewSet(SparseQuerysetMixin, ExpandQuerysetMixin, viewsets.ModelViewSet):
     queryset = Grade.objects.all()
     serializer_class = GradeSerializer
+    pagination_class = LargeTableCursorPagination
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        if not request.user.is_staff:
+            raise PermissionDenied('Only staff can upload grades.')
+
+        rows = request.data
+        if not isinstance(rows, list) or not rows:
+            return Response({'detail': 'Expected a non-empty list of grades.'}, status=status.HTTP_400_BAD_REQUEST)
+        result = save_grades(rows)
+        return Response(result, status=status.HTTP_400_BAD_REQUEST if result['errors'] else status.HTTP_200_OK)
 
-class StudentOfFacultyViewSet(viewsets.ModelViewSet):
+class StudentOfFacultyViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = StudentOfFaculty.objects.all()
     serializer_class = StudentOfFacultySerializer
 
-class StudentOfSpecialityViewSet(viewsets.ModelViewSet):
+class StudentOfSpecialityViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = StudentOfSpeciality.objects.all()
     serializer_class = StudentOfSpecialitySerializer
 
-class StudentOfLanguageViewSet(viewsets.ModelViewSet):
+class StudentOfLanguageViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = StudentOfLanguage.objects.all()
     serializer_class = StudentOfLanguageSerializer
 
-class DayOfWeekViewSet(viewsets.ModelViewSet):
+class DayOfWeekViewSet(ReferenceCacheMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = DayOfWeek.objects.all()
     serializer_class = DayOfWeekSerializer
 
-class ScheduleVersionViewSet(viewsets.ModelViewSet):
+class ScheduleVersionViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = ScheduleVersion.objects.all()
     serializer_class = ScheduleVersionSerializer
 
-class ScheduleViewSet(viewsets.ModelViewSet):
+class ScheduleViewSet(SparseQuerysetMixin, ExpandQuerysetMixin, viewsets.ModelViewSet):
     queryset = Schedule.objects.all()
     serializer_class = ScheduleSerializer
+    pagination_class = LargeTableCursorPagination
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -152,3 +153,63 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 
 DEFAULT_CHARSET = 'utf-8'
+
+
+# Excel-файл с расписанием.
+TIMETABLE_FILE = os.path.join(BASE_DIR, 'timetable.xlsx')
+
+# Все файлы расписания (семестры и кампусы). Листы каждого файла определяются автоматически.
+# Относительные пути считаются от BASE_DIR.
+TIMETABLE_SOURCES = [
+    {'key': 'default', 'file': TIMETABLE_FILE, 'semester': '', 'campus': ''},
+]
+
+# Сколько памяти (в байтах, примерно) могут занимать распарсенные файлы расписания.
+# Давно не использованные файлы выгружаются и парсятся заново при следующем обращении.
+TIMETABLE_MEMORY_BUDGET = 256 * 1024 * 1024
+
+# Фоновый поток, который заранее перечитывает изменённые файлы расписания. Включать только для
+# процессов веб-сервера (например, через переменную окружения): без него файл перечитывается
+# при первом запросе после изменения.
+TIMETABLE_WATCH = os.environ.get('TIMETABLE_WATCH') == '1'
+
+# Как часто (в секундах) фоновый поток проверяет, не изменился ли файл расписания. 0 - не проверять в фоне.
+TIMETABLE_WATCH_INTERVAL = 5
+
+
+# True - PDF заявления ставится в очередь при каждом сохранении,
+# False - создаётся при первом скачивании (/api/applications/<id>/pdf/).
+APPLICATION_PDF_EAGER = False
+
+# Очередь PDF заявлений (manage.py process_pdf_jobs): число процессов рендера,
+# сколько раз повторять задачу при ошибке и через сколько секунд считать задачу зависшей.
+PDF_RENDER_WORKERS = 2
+PDF_JOB_MAX_ATTEMPTS = 3
+PDF_JOB_TIMEOUT = 600
+
+# Сколько секунд кэшируется /api/applications/stats/.
+APPLICATION_STATS_CACHE_SECONDS = 5
+
+# Кэш, общий для всех процессов сервера: версия справочников (main/reference.py) и статистика
+# заявлений должны быть одни на все воркеры, а кэш в памяти у каждого процесса свой.
+# При нескольких серверах - Redis: 'django.core.cache.backends.redis.RedisCache'.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    },
+}
+# Тесты (manage.py test) не трогают кэш сервера: cache.clear() в них стёр бы каталог cache/.
+if sys.argv[1:2] == ['test']:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Сколько секунд хранятся закэшированные справочники (/api/reference/, /api/faculties/ и т.д.).
+# Изменение справочника сразу делает кэш устаревшим, см. main/reference.py.
+REFERENCE_CACHE_SECONDS = 24 * 60 * 60
+
+# Все списки API постраничные: справочники через ?limit=&offset=, большие таблицы
+# (оценки, расписание, заявления) через курсор, см. main/pagination.py.
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'main.pagination.ReferencePagination',
+    'PAGE_SIZE': 50,
+}